@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Compare ways of serializing posts: size, and time to encode and decode.
+
+    PYTHONPATH=. python benchmarks/codec.py [files...]
+
+Defaults to the posts in tests/.
+"""
+from __future__ import print_function
+
+import glob
+import json
+import pickle
+import sys
+import timeit
+
+import frontmatter
+
+
+def pickle_dict(post):
+    return pickle.dumps(post.__dict__, pickle.HIGHEST_PROTOCOL)
+
+
+def unpickle_dict(data):
+    post = frontmatter.Post('')
+    post.__dict__.update(pickle.loads(data))
+    return post
+
+
+def to_json(post):
+    return json.dumps(post.to_dict(), default=str).encode('utf-8')
+
+
+def from_json(data):
+    d = json.loads(data.decode('utf-8'))
+    return frontmatter.Post(d.pop('content'), **d)
+
+
+METHODS = [
+    ('pickle __dict__', pickle_dict, unpickle_dict),
+    ('pickle', lambda post: pickle.dumps(post, pickle.HIGHEST_PROTOCOL), pickle.loads),
+    ('json', to_json, from_json),
+    ('to_bytes', lambda post: post.to_bytes(), frontmatter.Post.from_bytes),
+    ('to_bytes compressed', lambda post: post.to_bytes(compress=True), frontmatter.Post.from_bytes),
+]
+
+
+def main(paths, number=2000):
+    posts = [frontmatter.load(path) for path in paths]
+    print('{0:<22}{1:>10}{2:>14}{3:>14}'.format('method', 'bytes', 'encode (us)', 'decode (us)'))
+
+    for name, encode, decode in METHODS:
+        encoded = [encode(post) for post in posts]
+        size = sum(len(data) for data in encoded)
+        dump = timeit.timeit(lambda: [encode(post) for post in posts], number=number)
+        load = timeit.timeit(lambda: [decode(data) for data in encoded], number=number)
+        per_post = 1e6 / (number * len(posts))
+        print('{0:<22}{1:>10}{2:>14.1f}{3:>14.1f}'.format(
+            name, size, dump * per_post, load * per_post))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:] or sorted(glob.glob('tests/*')))
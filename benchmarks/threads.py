@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Measure how parsing scales across threads sharing the default handlers.
+
+    PYTHONPATH=. python benchmarks/threads.py [files...]
+
+On a regular CPython build the GIL keeps speedups near 1x; on a
+free-threaded build (3.13t and later) throughput should grow with the
+number of threads, up to the number of cores.
+"""
+from __future__ import print_function
+
+import glob
+import io
+import os
+import sys
+import time
+from multiprocessing.pool import ThreadPool
+
+import frontmatter
+
+
+def parse_all(texts):
+    for text in texts:
+        frontmatter.loads(text)
+
+
+def run(texts, threads, rounds):
+    pool = ThreadPool(threads)
+    try:
+        start = time.time()
+        pool.map(parse_all, [texts] * rounds, chunksize=1)
+        return time.time() - start
+    finally:
+        pool.close()
+        pool.join()
+
+
+def main(paths, rounds=400):
+    texts = []
+    for path in paths:
+        with io.open(path, 'r', encoding='utf-8') as f:
+            texts.append(f.read())
+
+    gil = getattr(sys, '_is_gil_enabled', lambda: True)()
+    print('Python {0}, GIL {1}, {2} CPUs'.format(
+        sys.version.split()[0], 'enabled' if gil else 'disabled', os.cpu_count()))
+    print('{0:>8}{1:>14}{2:>10}'.format('threads', 'posts/sec', 'speedup'))
+
+    run(texts, 1, 10)  # warm up, importing backends
+    base = None
+    for threads in (1, 2, 4, 8, 16):
+        elapsed = run(texts, threads, rounds)
+        rate = rounds * len(texts) / elapsed
+        base = base or rate
+        print('{0:>8}{1:>14.0f}{2:>9.2f}x'.format(threads, rate, rate / base))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:] or sorted(glob.glob('tests/*')))
@@ -5,15 +5,25 @@ Python Frontmatter: Parse and manage posts with YAML frontmatter
 from __future__ import unicode_literals
 
 import codecs
+import importlib
+import io
 import re
-
-import six
+import sys
 
 from .util import u
-from .default_handlers import YAMLHandler, JSONHandler, TOMLHandler
+from .default_handlers import YAMLHandler, JSONHandler, TOMLHandler, select_keys
+
+
+__all__ = ['parse', 'load', 'loads', 'load_many', 'find_duplicates', 'read_header', 'dump',
+           'dumps', 'load_archive', 'top', 'aggregate', 'pack', 'to_columns', 'to_arrow']
 
+WHITESPACE = re.compile(r'\s*')
 
-__all__ = ['parse', 'load', 'loads', 'dump', 'dumps']
+EXCERPT_MARKER = '<!--more-->'
+EXCERPT_CHUNK = 4096
+
+# file extensions read when walking a directory for posts
+EXTENSIONS = ('.md', '.markdown', '.mdown', '.mkd', '.txt', '.html')
 
 POST_TEMPLATE = """\
 {start_delimiter}
@@ -39,9 +49,10 @@ def detect_format(text, handlers):
     ``text`` should be unicode text about to be parsed.
 
     ``handlers`` is a dictionary where keys are opening delimiters 
-    and values are handler instances.
+    and values are handler instances. It's copied before searching, so
+    other threads can add handlers meanwhile.
     """
-    for pattern, handler in handlers.items():
+    for pattern, handler in list(handlers.items()):
         if pattern.match(text):
             return handler
 
@@ -49,7 +60,7 @@ def detect_format(text, handlers):
     return None
 
 
-def parse(text, encoding='utf-8', handler=None, **defaults):
+def parse(text, encoding='utf-8', handler=None, limits=None, **defaults):
     """
     Parse text with frontmatter, return metadata and content.
     Pass in optional metadata defaults as keyword args.
@@ -64,34 +75,80 @@ def parse(text, encoding='utf-8', handler=None, **defaults):
         >>> print(metadata['title'])
         Hello, world!
 
+    Pass :py:class:`limits <frontmatter.limits.Limits>` to cap the size,
+    nesting, YAML alias use and parse time of the frontmatter. Going over
+    raises :py:class:`LimitError <frontmatter.limits.LimitError>`.
+
+    """
+    metadata, content, fm, offset = _parse(text, encoding, handler, defaults, limits=limits)
+    return metadata, content
+
+
+def _parse(text, encoding, handler, defaults, schema=None, keys=None, limits=None):
+    """
+    Does the work for :py:func:`parse`, returning a four-tuple of
+    metadata, content, the raw frontmatter text (or ``None``) and the
+    offset where content starts in ``text``, once line endings are fixed.
     """
     # ensure unicode first
-    text = u(text, encoding).strip()
+    text = u(text, encoding)
+    offset = WHITESPACE.match(text).end()
+    text = text.strip()
 
     # metadata starts with defaults
     metadata = defaults.copy()
+    content, raw = text, None
 
     # this will only run if a handler hasn't been set higher up
     handler = handler or detect_format(text, handlers)
-    if handler is None:
-        return metadata, text
-
-    # split on the delimiters
-    try:
-        fm, content = handler.split(text)
-    except ValueError:
-        # if we can't split, bail
-        return metadata, text
+    if handler is not None:
+        # split on the delimiters, bailing if we can't
+        try:
+            raw, content = handler.split(text)
+        except ValueError:
+            pass
 
     # parse, now that we have frontmatter
-    fm = handler.load(fm)
-    if isinstance(fm, dict):
-        metadata.update(fm)
-
-    return metadata, content.strip()
-
-
-def load(fd, encoding='utf-8', handler=None, **defaults):
+    if raw is not None:
+        if limits is not None:
+            fm = _load_limited(handler, raw, limits)
+            if keys is not None:
+                fm = select_keys(fm, keys)
+        elif keys is None:
+            fm = handler.load(raw)
+        elif hasattr(handler, 'load_keys'):
+            fm = handler.load_keys(raw, keys)
+        else:
+            fm = select_keys(handler.load(raw), keys)
+        if isinstance(fm, dict):
+            metadata.update(fm)
+        offset += len(text) - len(content) + WHITESPACE.match(content).end()
+        content = content.strip()
+
+    if schema is not None:
+        from .schema import Schema
+        metadata = Schema.compile(schema)(metadata)
+
+    return metadata, content, raw, offset
+
+
+def _load_limited(handler, fm, limits):
+    "Load frontmatter within ``limits``, for handlers with or without ``load_limited``"
+    from .limits import Limits
+    limits = Limits.compile(limits)
+    limits.check_size(fm)
+    if hasattr(handler, 'load_limited'):
+        return handler.load_limited(fm, limits)
+
+    deadline = limits.deadline()
+    metadata = handler.load(fm)
+    limits.check_time(deadline)
+    limits.check_depth(metadata)
+    return metadata
+
+
+def load(fd, encoding='utf-8', handler=None, schema=None, header_only=False,
+         keys=None, excerpt=None, limits=None, **defaults):
     """
     Load and parse a file-like object or filename, 
     return a :py:class:`post <frontmatter.Post>`.
@@ -102,19 +159,234 @@ def load(fd, encoding='utf-8', handler=None, **defaults):
         >>> with open('tests/hello-world.markdown') as f:
         ...     post = frontmatter.load(f)
 
+    Pass a :py:class:`schema <frontmatter.schema.Schema>` to validate and
+    coerce metadata as it's parsed. Errors are raised as a single
+    :py:class:`SchemaError <frontmatter.schema.SchemaError>` naming the file.
+
+    Pass a list of ``keys`` to parse only those top-level metadata keys.
+    For YAML, other values are skipped without being built, and parsing
+    stops once all ``keys`` are found.
+
+    ``limits`` are as for :py:func:`parse`; a
+    :py:class:`LimitError <frontmatter.limits.LimitError>` names the file.
+
+    With ``header_only``, reading stops at the end of the frontmatter and
+    the returned post has empty content. Don't dump these posts back over
+    their source files.
+
+    ::
+
+        >>> post = frontmatter.load('tests/hello-world.markdown', header_only=True)
+        >>> post['title'], post.content
+        ('Hello, world!', '')
+
+    Pass ``excerpt`` to read only as far into the body as an excerpt needs:
+    ``True`` reads up to ``<!--more-->``, a number reads up to the marker or
+    that many characters, and a string reads up to that marker. As with
+    ``header_only`` the post has empty content, and the excerpt is kept for
+    :py:meth:`Post.excerpt`.
+
+    ::
+
+        >>> post = frontmatter.load('tests/hello-world.markdown', excerpt=10)
+        >>> post.excerpt(10)
+        'Well, hell'
+
     """
+    if excerpt is False:
+        excerpt = None
+    if excerpt is not None:
+        length, marker = _excerpt_options(excerpt)
+
+    def read(f):
+        if excerpt is not None:
+            return _read_prefix(f, encoding, handler, length, marker)
+        if header_only:
+            return read_header(f, encoding, handler)
+        return f.read()
+
     if hasattr(fd, 'read'):
-        text = fd.read()
+        text = read(fd)
+        filename = getattr(fd, 'name', None)
+
+    elif header_only or excerpt is not None:
+        with io.open(fd, 'r', encoding=encoding) as f:
+            text = read(f)
+        filename = fd
 
     else:
         with codecs.open(fd, 'r', encoding) as f:
             text = f.read()
+        filename = fd
 
     handler = handler or detect_format(text, handlers)
-    return loads(text, encoding, handler, **defaults)
+    if schema is None and limits is None:
+        post = loads(text, encoding, handler, keys=keys, **defaults)
 
+    else:
+        from .limits import LimitError
+        from .schema import SchemaError
+        try:
+            post = loads(text, encoding, handler, schema, keys, limits, **defaults)
+        except SchemaError as e:
+            raise SchemaError(e.errors, filename)
+        except LimitError as e:
+            raise LimitError(e.limit, e.maximum, filename)
+
+    if excerpt is not None:
+        post._excerpt = ((length, marker), _excerpt(post.content, length, marker))
+
+    if header_only or excerpt is not None:
+        post.content = ''
+        post._source = (None if hasattr(fd, 'read') else fd, encoding)
+    return post
+
+
+def _excerpt_options(excerpt):
+    "Turn ``load``'s ``excerpt`` argument into a length and marker"
+    if excerpt is True:
+        return None, EXCERPT_MARKER
+    if isinstance(excerpt, int):
+        return excerpt, EXCERPT_MARKER
+    return None, excerpt
+
+
+def _excerpt(content, length, marker):
+    """
+    Cut ``content`` at ``marker`` if it starts within the first ``length``
+    characters, otherwise at ``length``
+    """
+    end = len(content) if length is None else length
+    if marker:
+        index = content.find(marker, 0, end + len(marker))
+        if index >= 0:
+            end = index
+    return content[:end].strip()
 
-def loads(text, encoding='utf-8', handler=None, **defaults):
+
+def _read_prefix(fd, encoding, handler, length, marker):
+    """
+    Read text from ``fd`` in chunks until it holds the frontmatter and
+    enough of the body for an excerpt, or the file ends. Each chunk is
+    only searched once, so this stays linear in the amount read.
+    """
+    decoder = codecs.getincrementaldecoder(encoding)()
+    text = ''
+    lead = start = body = None
+    while True:
+        chunk = fd.read(EXCERPT_CHUNK)
+        if isinstance(chunk, bytes):
+            chunk = decoder.decode(chunk, final=not chunk)
+        if not chunk:
+            return text
+
+        checked = len(text)
+        text += chunk
+
+        if lead is None:
+            # skip blank space, then find out what we're reading
+            lead = WHITESPACE.match(text).end()
+            if lead == len(text):
+                lead = None
+                continue
+            handler = handler or detect_format(text[lead:], handlers)
+            if handler is None:
+                start = lead
+            checked = lead
+
+        if start is None:
+            start = _header_end(text, lead, checked, handler)
+            if start is None:
+                continue  # frontmatter isn't finished yet
+            checked = start
+
+        if body is None:
+            body = WHITESPACE.match(text, checked).end()
+            if body == len(text):
+                body = None
+                continue
+            checked = body
+
+        if marker and text.find(marker, max(body, checked - len(marker) + 1)) >= 0:
+            return text
+        if length is not None and len(text) - body >= length + len(marker or ''):
+            return text
+
+
+def _header_end(text, lead, checked, handler):
+    """
+    Find where the body starts, once ``text`` holds the whole header, or
+    return ``None``. Splitting is only tried when the text after
+    ``checked`` could have closed the header.
+    """
+    if hasattr(handler, 'scan'):
+        if text.find('}', checked) < 0:
+            return None
+    elif handler.FM_BOUNDARY is not None:
+        if handler.FM_BOUNDARY.search(text, text.rfind('\n', 0, checked) + 1) is None:
+            return None
+
+    stripped = text[lead:].rstrip()
+    try:
+        content = handler.split(stripped)[1]
+    except ValueError:
+        return None
+    return lead + len(stripped) - len(content)
+
+
+def read_header(fd, encoding='utf-8', handler=None):
+    """
+    Read frontmatter from the start of a file-like object, stopping after
+    the closing delimiter so the body is never read. Returns the text read,
+    or an empty string if ``fd`` doesn't start with frontmatter.
+    """
+    lines = []
+    boundary = scan = None
+    depth = 0
+    while True:
+        line = fd.readline()
+        if not line:
+            break
+
+        line = u(line, encoding)
+        if lines:
+            lines.append(line)
+            if scan is not None:
+                end, depth = scan(line, depth)
+                if end is not None:
+                    break
+            elif boundary.match(line):
+                break
+            continue
+
+        # skip blank lines, then find out what we're reading
+        if not line.strip():
+            continue
+
+        handler = handler or detect_format(line, handlers)
+        if handler is None:
+            return ''
+
+        boundary = getattr(handler, 'FM_BOUNDARY', None)
+        if boundary is None:
+            # can't tell where this one ends, so read everything
+            return line + u(fd.read(), encoding)
+
+        # handlers that can scan for the end of their header, like JSON's,
+        # may finish on the first line
+        scan = getattr(handler, 'scan', None)
+        if scan is not None:
+            end, depth = scan(line)
+            if end is not None:
+                return line
+
+        lines.append(line)
+
+    return ''.join(lines)
+
+
+def loads(text, encoding='utf-8', handler=None, schema=None, keys=None, limits=None,
+          **defaults):
     """
     Parse text (binary or unicode) and return a :py:class:`post <frontmatter.Post>`.
 
@@ -126,8 +398,20 @@ def loads(text, encoding='utf-8', handler=None, **defaults):
     """
     text = u(text, encoding)
     handler = handler or detect_format(text, handlers)
-    metadata, content = parse(text, encoding, handler, **defaults)
-    return Post(content, handler, **metadata)
+    metadata, content, fm, offset = _parse(text, encoding, handler, defaults, schema, keys,
+                                           limits)
+
+    # raw frontmatter can only be written back if it's all there is to the
+    # metadata, with nothing added, coerced or left out
+    if defaults or schema is not None or keys is not None:
+        fm = None
+
+    post = Post(content, handler, **metadata)
+    post._fm = fm
+    post._offset = offset
+    if fm is not None:
+        post._fingerprint = _fingerprint(post)
+    return post
 
 
 def dump(post, fd, encoding='utf-8', handler=None, **kwargs):
@@ -168,6 +452,11 @@ def dumps(post, handler=None, **kwargs):
     passed as an argument will override ``post.handler``, with 
     :py:class:`YAMLHandler <frontmatter.default_handlers.YAMLHandler>` used as 
     a default.
+
+    If the post was loaded from text and its metadata hasn't changed, the
+    original frontmatter is written back verbatim instead of being exported
+    again, which keeps key order and formatting intact. Passing a different
+    handler, custom delimiters or export options always exports fresh metadata.
     ::
 
         >>> print(frontmatter.dumps(post))
@@ -185,7 +474,12 @@ def dumps(post, handler=None, **kwargs):
     start_delimiter = kwargs.pop('start_delimiter', handler.START_DELIMITER)
     end_delimiter = kwargs.pop('end_delimiter', handler.END_DELIMITER)
 
-    metadata = handler.export(post.metadata, **kwargs)
+    if not kwargs and start_delimiter == handler.START_DELIMITER \
+            and end_delimiter == handler.END_DELIMITER \
+            and _unchanged(post, handler):
+        metadata = post._fm.strip()
+    else:
+        metadata = handler.export(post.metadata, **kwargs)
 
     return POST_TEMPLATE.format(
         metadata=metadata, content=post.content,
@@ -193,6 +487,51 @@ def dumps(post, handler=None, **kwargs):
         end_delimiter=end_delimiter).strip()
 
 
+def _unchanged(post, handler):
+    """
+    Check whether ``post`` still has the frontmatter it was loaded with,
+    so :py:func:`dumps` can reuse it. Posts that had keys set or deleted
+    are dirty; otherwise metadata is compared with a fingerprint taken when
+    it was loaded, which also catches in-place changes to nested values.
+    """
+    fm = getattr(post, '_fm', None)
+    if fm is None or getattr(post, '_dirty', True):
+        return False
+
+    if handler is not getattr(post, 'handler', None):
+        return False
+
+    fingerprint = getattr(post, '_fingerprint', None)
+    return fingerprint is not None and fingerprint == _fingerprint(post)
+
+
+def _raw_frontmatter(post):
+    """
+    The raw frontmatter to store with a post when it's serialized, or
+    ``None`` if it has changed and would be stale
+    """
+    if _unchanged(post, getattr(post, 'handler', None)):
+        return post._fm
+    return None
+
+
+def _fingerprint(post):
+    """
+    Digest a post's metadata, along with its handler, so changes to either
+    can be spotted later; ``None`` if the metadata can't be pickled.
+    Pickling is much faster than parsing, and anything that pickles
+    differently counts as changed.
+    """
+    import hashlib
+    import pickle
+
+    try:
+        data = pickle.dumps(post.metadata, pickle.HIGHEST_PROTOCOL)
+    except Exception:
+        return None
+    return post.handler, hashlib.sha1(data).digest()
+
+
 class Post(object):
     """
     A post contains content and metadata from Front Matter. This is what gets
@@ -207,6 +546,21 @@ class Post(object):
         self.metadata = metadata
         self.handler = handler
 
+        # raw frontmatter this post was loaded from and a fingerprint of
+        # its metadata, see dumps()
+        self._fm = None
+        self._dirty = False
+        self._fingerprint = None
+
+        # where content started in the source text, if it was loaded
+        self._offset = None
+
+        # (filename, encoding) for posts loaded without their content, with
+        # no filename if they came from a file object, and the last excerpt
+        # read from it, see excerpt()
+        self._source = None
+        self._excerpt = None
+
     def __getitem__(self, name):
         "Get metadata key"
         return self.metadata[name]
@@ -218,16 +572,18 @@ class Post(object):
     def __setitem__(self, name, value):
         "Set a metadata key"
         self.metadata[name] = value
+        self._dirty = True
 
     def __delitem__(self, name):
         "Delete a metadata key"
         del self.metadata[name]
+        self._dirty = True
 
     def __bytes__(self):
         return self.content.encode('utf-8')
 
     def __str__(self):
-        if six.PY2:
+        if sys.version_info[0] == 2:
             return self.__bytes__()
         return self.content
 
@@ -252,3 +608,106 @@ class Post(object):
         d['content'] = self.content
         return d
 
+    def excerpt(self, length=None, marker=EXCERPT_MARKER):
+        """
+        Return the start of the content, up to ``marker`` if it starts
+        within the first ``length`` characters, or else the first
+        ``length`` characters. With no ``length``, the excerpt runs to the
+        marker or the end of the content.
+
+        Posts loaded with ``header_only`` or ``excerpt`` have no content, so
+        their excerpt is read from the source file, only as far as needed,
+        and cached on the post. If they were loaded from a file object,
+        there's nothing to read again, so only the excerpt given to
+        :py:func:`load <frontmatter.load>` is available; asking for any
+        other raises ``ValueError``.
+
+        ::
+
+            >>> post = frontmatter.load('tests/hello-world.markdown', header_only=True)
+            >>> post.excerpt(5)
+            'Well,'
+
+        """
+        options = (length, marker)
+        if not self.content and self._excerpt is not None and self._excerpt[0] == options:
+            return self._excerpt[1]
+
+        if self.content or self._source is None:
+            return _excerpt(self.content, length, marker)
+
+        filename, encoding = self._source
+        if filename is None:
+            raise ValueError("This post's content wasn't loaded, and it has no source "
+                             "file to read an excerpt from")
+
+        with io.open(filename, 'r', encoding=encoding) as f:
+            text = _read_prefix(f, encoding, self.handler, length, marker)
+
+        metadata, content, fm, offset = _parse(text, encoding, self.handler, {})
+        self._excerpt = (options, _excerpt(content, length, marker))
+        return self._excerpt[1]
+
+    def to_bytes(self, compress=False):
+        """
+        Encode the post in a compact binary format, for caching or sending
+        to another process. Pass ``compress`` to deflate it with zlib.
+        See :py:mod:`frontmatter.codec` for the types metadata can hold.
+
+        ::
+
+            >>> data = post.to_bytes()
+            >>> frontmatter.Post.from_bytes(data).to_dict() == post.to_dict()
+            True
+
+        """
+        from .codec import dumps
+        return dumps(self, compress)
+
+    @classmethod
+    def from_bytes(cls, data):
+        "Decode a post made by :py:meth:`to_bytes`"
+        from .codec import loads
+        return loads(data, cls)
+
+    def __reduce__(self):
+        # pickle the parts instead of __dict__, naming built-in handlers
+        # rather than pickling them
+        from .codec import handler_name, is_default, rebuild
+        handler = getattr(self, 'handler', None)
+        if handler is not None and is_default(handler):
+            handler = handler_name(handler)
+
+        args = (type(self), handler, self.metadata, self.content,
+                _raw_frontmatter(self), getattr(self, '_offset', None))
+
+        source = getattr(self, '_source', None)
+        if source is None:
+            return rebuild, args
+        return rebuild, args, {'_source': source, '_excerpt': self._excerpt}
+
+
+# the rest of the API builds on everything above, in submodules that are
+# only imported when first used
+LAZY = {
+    'load_many': 'batch',
+    'find_duplicates': 'batch',
+    'load_archive': 'archive',
+    'top': 'listing',
+    'aggregate': 'facets',
+    'pack': 'bundle',
+    'to_columns': 'columns',
+    'to_arrow': 'columns',
+}
+
+
+def __getattr__(name):
+    if name not in LAZY:
+        raise AttributeError('module {0!r} has no attribute {1!r}'.format(__name__, name))
+    value = getattr(importlib.import_module('.' + LAZY[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(LAZY))
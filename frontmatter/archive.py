@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+Load posts straight out of zip and tar archives, without extracting them.
+"""
+from __future__ import unicode_literals
+
+import fnmatch
+import functools
+
+from . import read_header
+from .batch import _imap, _loads_item
+
+
+__all__ = ['load_archive']
+
+
+def load_archive(path, encoding='utf-8', handler=None, header_only=False,
+                 match=None, processes=None, chunksize=16, **kwargs):
+    """
+    Load posts from each file in a zip or tar archive (compressed or not),
+    yielding ``(name, post)`` pairs in archive order.
+
+    ``match`` is an optional glob pattern, like ``*.md``, that member names
+    must match.
+
+    With ``header_only``, only the frontmatter of each member is
+    decompressed and the rest is skipped; posts have empty content. Zip
+    members are read independently, so skipping is free. Tar members are
+    skipped by seeking, which still decompresses compressed tarballs but
+    never decodes or parses the bodies.
+
+    Members are always read in this process. Set ``processes`` to parse
+    them in a pool of worker processes, as with
+    :py:func:`load_many <frontmatter.load_many>`. Other keyword arguments
+    are passed to :py:func:`loads <frontmatter.loads>`.
+
+    ::
+
+        >>> for name, post in frontmatter.load_archive('site.zip', match='*.md'): # doctest: +SKIP
+        ...     print(name, post['title'])
+
+    """
+    members = _members(path, encoding, handler, header_only, match)
+    worker = functools.partial(_loads_item, encoding=encoding, handler=handler,
+                               header_only=header_only, kwargs=kwargs)
+
+    if processes is None:
+        results = (worker(member) for member in members)
+    else:
+        results = _imap(worker, members, processes, chunksize)
+
+    for result in results:
+        yield result
+
+
+def _members(path, encoding, handler, header_only, match):
+    "Yield ``(name, text)`` for each matching file in the archive at ``path``"
+    import tarfile
+    import zipfile
+
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as archive:
+            for info in archive.infolist():
+                if info.filename.endswith('/') or not _matches(info.filename, match):
+                    continue
+                with archive.open(info) as f:
+                    yield info.filename, _read(f, encoding, handler, header_only)
+        return
+
+    archive = tarfile.open(path, 'r:*')
+    try:
+        for info in archive:
+            if not info.isfile() or not _matches(info.name, match):
+                continue
+            f = archive.extractfile(info)
+            try:
+                yield info.name, _read(f, encoding, handler, header_only)
+            finally:
+                f.close()
+    finally:
+        archive.close()
+
+
+def _matches(name, match):
+    return match is None or fnmatch.fnmatch(name, match)
+
+
+def _read(f, encoding, handler, header_only):
+    if header_only:
+        return read_header(f, encoding, handler)
+    return f.read()
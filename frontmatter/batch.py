@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+"""
+Load many posts at once, optionally spreading the work across processes.
+"""
+from __future__ import unicode_literals
+
+import collections
+import copy
+import functools
+import hashlib
+import io
+import os
+
+from . import load, loads
+
+
+__all__ = ['load_many', 'find_duplicates']
+
+HASH_CHUNK = 1 << 20
+
+
+def load_many(paths, encoding='utf-8', handler=None, schema=None, header_only=False,
+              keys=None, processes=None, chunksize=16, storage=None, dedupe=False,
+              **defaults):
+    """
+    Load and parse an iterable of filenames, yielding a
+    :py:class:`post <frontmatter.Post>` for each, in order.
+
+    Set ``processes`` to parse in a pool of worker processes (``0`` uses one
+    per CPU). Posts are yielded as they're ready, so the whole corpus never
+    needs to be in memory. ``handler``, ``schema``, ``header_only``, ``keys``
+    and ``defaults`` are passed along to :py:func:`frontmatter.load <frontmatter.load>`; a schema
+    given as a dict is compiled once, up front.
+
+    ::
+
+        >>> posts = frontmatter.load_many(['tests/hello-world.markdown', 'tests/hello-json.markdown'])
+        >>> [post['title'] if 'title' in post else None for post in posts]
+        ['Hello, world!', None]
+
+    Pass a :py:class:`storage backend <frontmatter.storage.Storage>` to
+    read files through it instead of opening them directly. Files are then
+    fetched ahead of parsing by a pool of threads, and with ``header_only``
+    only the first few kilobytes of each file are read.
+
+    Set ``dedupe`` to parse byte-identical files only once. Each duplicate
+    still gets its own post, with metadata copied from a template kept
+    aside when the first one was parsed, so changing one post never
+    changes another. See :py:func:`find_duplicates`.
+
+    """
+    if schema is not None:
+        from .schema import Schema
+        schema = Schema.compile(schema)
+
+    if dedupe:
+        if storage is not None:
+            raise ValueError('dedupe only works with local files, not storage')
+        fingerprints = _fingerprints(paths)
+        counts = collections.Counter(key for path, key in fingerprints)
+        paths = _first(fingerprints)
+
+    if storage is None:
+        worker = functools.partial(_load, encoding=encoding, handler=handler,
+                                   schema=schema, header_only=header_only,
+                                   keys=keys, defaults=defaults)
+        items = paths
+    else:
+        defaults.update(schema=schema, keys=keys)
+        worker = functools.partial(_loads_item, encoding=encoding, handler=handler,
+                                   header_only=header_only, kwargs=defaults)
+        items = storage.fetch(paths, header_only, encoding, handler)
+
+    if processes is None:
+        results = (worker(item) for item in items)
+    else:
+        results = _imap(worker, items, processes, chunksize)
+
+    if dedupe:
+        results = _share(fingerprints, results, counts, encoding)
+
+    for result in results:
+        yield result if storage is None else result[1]
+
+
+def find_duplicates(paths):
+    """
+    Find byte-identical files among ``paths``, returning a list of groups
+    of two or more paths, in the order they were first seen.
+
+    Only files that share a size with another file are read and hashed,
+    so checking a tree of mostly distinct files is cheap.
+
+    ::
+
+        >>> frontmatter.find_duplicates(['tests/hello-world.markdown', 'tests/chinese.txt',
+        ...                              'tests/hello-world.markdown'])
+        [['tests/hello-world.markdown', 'tests/hello-world.markdown']]
+
+    """
+    groups = collections.OrderedDict()
+    for path, key in _fingerprints(paths):
+        groups.setdefault(key, []).append(path)
+    return [group for group in groups.values() if len(group) > 1]
+
+
+def _fingerprints(paths):
+    """
+    Pair each path with a key that only byte-identical files share: its
+    size, plus a hash of its contents if another file has the same size.
+    """
+    paths = list(paths)
+    sizes = [os.path.getsize(path) for path in paths]
+    counts = collections.Counter(sizes)
+    return [(path, (size, _digest(path) if counts[size] > 1 else path))
+            for path, size in zip(paths, sizes)]
+
+
+def _digest(path):
+    h = hashlib.blake2b(digest_size=16) if hasattr(hashlib, 'blake2b') else hashlib.sha1()
+    with io.open(path, 'rb') as f:
+        for chunk in iter(functools.partial(f.read, HASH_CHUNK), b''):
+            h.update(chunk)
+    return h.digest()
+
+
+def _first(fingerprints):
+    "Yield the first path with each key"
+    seen = set()
+    for path, key in fingerprints:
+        if key not in seen:
+            seen.add(key)
+            yield path
+
+
+def _share(fingerprints, posts, counts, encoding):
+    """
+    Yield a post for every path in ``fingerprints``, taking posts for the
+    first of each key from ``posts`` and copying them for the rest.
+    ``counts`` says how many paths have each key.
+    """
+    posts = iter(posts)
+    parsed = {}
+    for path, key in fingerprints:
+        counts[key] -= 1
+        if key not in parsed:
+            post = next(posts)
+            if counts[key]:
+                # copy before yielding, in case the caller changes the post
+                parsed[key] = _copy(post, path, encoding)
+        elif counts[key]:
+            post = _copy(parsed[key], path, encoding)
+        else:
+            # nothing else needs the template, so the last duplicate takes it
+            post = parsed.pop(key)
+            if post._source is not None:
+                post._source = (path, encoding)
+        yield post
+
+
+def _copy(post, path, encoding):
+    "Copy a post for another path, sharing nothing mutable with the original"
+    duplicate = type(post).__new__(type(post))
+    duplicate.__dict__.update(post.__dict__)
+    duplicate.metadata = copy.deepcopy(post.metadata)
+    if post._source is not None:
+        duplicate._source = (path, encoding)
+    return duplicate
+
+
+def _load(path, encoding, handler, schema, header_only, keys, defaults):
+    return load(path, encoding, handler, schema, header_only, keys, **defaults)
+
+
+def _loads_item(item, encoding, handler, header_only, kwargs):
+    """
+    Parse a ``(name, text)`` pair that's already been read, returning
+    ``(name, post)``. ``kwargs`` are passed to :py:func:`frontmatter.loads`.
+    """
+    name, text = item
+    if kwargs.get('schema') is None and kwargs.get('limits') is None:
+        post = loads(text, encoding, handler, **kwargs)
+    else:
+        from .limits import LimitError
+        from .schema import SchemaError
+        try:
+            post = loads(text, encoding, handler, **kwargs)
+        except SchemaError as e:
+            raise SchemaError(e.errors, name)
+        except LimitError as e:
+            raise LimitError(e.limit, e.maximum, name)
+
+    if header_only:
+        post.content = ''
+        post._source = (None, encoding)
+    return name, post
+
+
+def _imap(func, iterable, processes, chunksize):
+    "Map ``func`` over ``iterable`` in a process pool, lazily and in order"
+    import multiprocessing
+
+    pool = multiprocessing.Pool(processes or None)
+    try:
+        for result in pool.imap(func, iterable, chunksize):
+            yield result
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+"""
+Bundles pack a whole corpus into one indexed file, so a process can start
+up with a single ``mmap`` instead of opening, decoding and parsing
+thousands of files.
+
+:py:func:`frontmatter.pack <frontmatter.pack>` parses each post once and
+stores its metadata pre-parsed, in the binary format from
+:py:mod:`frontmatter.codec`. A :py:class:`Bundle` maps the file into memory
+and builds posts on demand, touching only the bytes for the posts you ask
+for::
+
+    >>> import os, tempfile
+    >>> from frontmatter.bundle import Bundle
+    >>> filename = os.path.join(tempfile.mkdtemp(), 'site.fmb')
+    >>> frontmatter.pack(['tests/hello-world.markdown', 'tests/chinese.txt'], filename, root='tests')
+    2
+    >>> with Bundle(filename) as bundle:
+    ...     print(bundle['hello-world.markdown']['title'])
+    ...     print(bundle.metadata('chinese.txt')['title'])
+    Hello, world!
+    Let's try unicode
+
+The file starts with a fixed header, then the metadata records, then the
+bodies as UTF-8 text, one after another. An offset table and the list of
+names come last.
+"""
+from __future__ import unicode_literals
+
+import io
+import mmap
+import os
+import struct
+
+from . import Post, _raw_frontmatter
+from .batch import load_many
+from .codec import decode, encode, handler_name, rebuild
+
+
+__all__ = ['pack', 'Bundle']
+
+MAGIC = b'FMPK'
+VERSION = 1
+
+# magic, version, post count, offset of the table, offset of the names
+HEADER = struct.Struct('<4sHxxIQQ')
+
+# metadata offset and size, body offset and size
+ENTRY = struct.Struct('<QIQQ')
+
+
+def pack(paths, out, root=None, encoding='utf-8', handler=None, processes=None,
+         chunksize=16, **kwargs):
+    """
+    Load every file in ``paths`` and write them to ``out``, a filename or
+    a seekable binary file, as a bundle. Returns the number of posts.
+
+    Posts are named by their path, relative to ``root`` if given.
+    ``processes`` and other keyword arguments are passed to
+    :py:func:`load_many <frontmatter.load_many>`.
+    """
+    if not hasattr(out, 'write'):
+        with io.open(out, 'wb') as f:
+            return pack(paths, f, root, encoding, handler, processes, chunksize, **kwargs)
+
+    import shutil
+    import tempfile
+
+    paths = list(paths)
+    posts = load_many(paths, encoding, handler, processes=processes, chunksize=chunksize,
+                      **kwargs)
+
+    start = out.tell()
+    out.write(b'\0' * HEADER.size)
+
+    names = []
+    entries = []
+    bodies = tempfile.TemporaryFile()
+    try:
+        body_size = 0
+        for path, post in zip(paths, posts):
+            names.append(os.path.relpath(path, root) if root is not None else path)
+
+            record = encode([handler_name(post.handler), post.metadata,
+                             _raw_frontmatter(post), post._offset])
+            body = post.content.encode('utf-8')
+            entries.append((out.tell() - start, len(record), body_size, len(body)))
+
+            out.write(record)
+            bodies.write(body)
+            body_size += len(body)
+
+        bodies_start = out.tell() - start
+        bodies.seek(0)
+        shutil.copyfileobj(bodies, out)
+    finally:
+        bodies.close()
+
+    table = out.tell() - start
+    for meta_offset, meta_size, body_offset, size in entries:
+        out.write(ENTRY.pack(meta_offset, meta_size, bodies_start + body_offset, size))
+
+    names_offset = out.tell() - start
+    out.write(encode(names))
+
+    end = out.tell()
+    out.seek(start)
+    out.write(HEADER.pack(MAGIC, VERSION, len(entries), table, names_offset))
+    out.seek(end)
+    return len(entries)
+
+
+class Bundle(object):
+    """
+    A bundle written by :py:func:`pack <frontmatter.pack>`, memory-mapped
+    from ``filename``. Look posts up by name, like a read-only dict.
+
+    Each lookup decodes just that post's metadata and body, so a bundle
+    costs next to nothing until it's used. Posts are built as ``cls``,
+    :py:class:`Post <frontmatter.Post>` by default.
+    """
+    def __init__(self, filename, cls=Post):
+        self.filename = filename
+        self.cls = cls
+        with io.open(filename, 'rb') as f:
+            self._buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._read_index()
+        except Exception:
+            self.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return len(self.names)
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __contains__(self, name):
+        return name in self._positions
+
+    def __getitem__(self, name):
+        "Load the post called ``name``"
+        meta_offset, meta_size, body_offset, body_size = self._entry(name)
+        buf = self._buffer
+        handler, metadata, fm, offset = decode(buf[meta_offset:meta_offset + meta_size])
+        content = bytes(buf[body_offset:body_offset + body_size]).decode('utf-8')
+        return rebuild(self.cls, handler, metadata, content, fm, offset)
+
+    def get(self, name, default=None):
+        "Load a post, or return ``default`` if there's none called ``name``"
+        if name not in self:
+            return default
+        return self[name]
+
+    def metadata(self, name):
+        "Decode just the metadata of a post, skipping its body"
+        meta_offset, meta_size, body_offset, body_size = self._entry(name)
+        return decode(self._buffer[meta_offset:meta_offset + meta_size])[1]
+
+    def items(self):
+        "Yield ``(name, post)`` for every post, in the order they were packed"
+        for name in self.names:
+            yield name, self[name]
+
+    def close(self):
+        "Unmap the file"
+        if self._buffer is not None:
+            self._buffer.close()
+            self._buffer = None
+
+    def _read_index(self):
+        buf = self._buffer
+        if len(buf) < HEADER.size:
+            raise ValueError('Not a bundle: {0}'.format(self.filename))
+
+        magic, version, count, table, names_offset = HEADER.unpack_from(buf, 0)
+        if magic != MAGIC:
+            raise ValueError('Not a bundle: {0}'.format(self.filename))
+        if version != VERSION:
+            raise ValueError('Unsupported bundle version: {0}'.format(version))
+
+        self.names = decode(buf[names_offset:])
+        self._table = table
+        self._positions = dict((name, i) for i, name in enumerate(self.names))
+
+    def _entry(self, name):
+        position = self._positions[name]
+        return ENTRY.unpack_from(self._buffer, self._table + position * ENTRY.size)
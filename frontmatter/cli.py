@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+"""
+Pull metadata out of a tree of files from the command line.
+
+::
+
+    $ python -m frontmatter content/ --keys title,date --where tags~=python
+    {"path": "content/hello.md", "title": "Hello", "date": "2017-01-02"}
+
+Only frontmatter is read, never post bodies, and files are parsed across
+all CPUs by default. Output is JSON Lines, or CSV with ``--format csv``.
+
+Filters passed with ``--where`` must all match:
+
+- ``key`` -- the key is present
+- ``key=value`` -- the value is ``value``, or is a list containing it
+- ``key!=value`` -- the opposite of ``key=value``
+- ``key~=value`` -- the value contains ``value``, as a substring or list item
+"""
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import argparse
+import csv
+import functools
+import io
+import json
+import os
+import re
+import sys
+import time
+
+from . import EXTENSIONS, load
+from .batch import _imap
+
+
+__all__ = ['main']
+
+DEFAULT_EXTENSIONS = ','.join(e.lstrip('.') for e in EXTENSIONS)
+
+WHERE = re.compile(r'^(?P<key>[^=!~]+?)\s*(?:(?P<op>!=|~=|=)\s*(?P<value>.*))?$')
+
+
+def main(argv=None):
+    "Run the command line tool"
+    args = parser().parse_args(argv)
+
+    keys = split(args.keys) or None
+    if args.format == 'csv' and keys is None:
+        sys.exit('frontmatter: CSV output needs --keys')
+
+    try:
+        wheres = [Where(w) for w in args.where]
+    except ValueError as e:
+        sys.exit('frontmatter: {0}'.format(e))
+
+    extensions = tuple('.' + e.lstrip('.') for e in split(args.ext or [DEFAULT_EXTENSIONS]))
+    paths = walk(args.paths or ['.'], extensions)
+    worker = functools.partial(extract, encoding=args.encoding, keys=keys, wheres=wheres)
+
+    if args.jobs == 1:
+        results = (worker(path) for path in paths)
+    else:
+        results = _imap(worker, paths, args.jobs, args.chunksize)
+
+    output = io.open(args.output, 'w', encoding='utf-8', newline='') if args.output else None
+    write = writer(args.format, output or sys.stdout, keys)
+
+    start = time.time()
+    files = matched = errors = 0
+    try:
+        for path, record, error in results:
+            files += 1
+            if error:
+                errors += 1
+                print('frontmatter: {0}: {1}'.format(path, error), file=sys.stderr)
+            elif record is not None:
+                matched += 1
+                write(record)
+    finally:
+        if output:
+            output.close()
+
+    if args.stats:
+        elapsed = time.time() - start
+        print('{0} files, {1} matched, {2} errors in {3:.2f}s ({4:.0f} files/s)'.format(
+            files, matched, errors, elapsed, files / elapsed if elapsed else 0),
+            file=sys.stderr)
+
+    return 1 if errors else 0
+
+
+def parser():
+    "Build the argument parser"
+    p = argparse.ArgumentParser(prog='frontmatter',
+        description='Extract frontmatter metadata from files and directories.')
+    p.add_argument('paths', nargs='*', help='files or directories to read (default: .)')
+    p.add_argument('-k', '--keys', action='append', default=[],
+        help='comma-separated metadata keys to output (default: all)')
+    p.add_argument('-w', '--where', action='append', default=[],
+        help='only output posts matching a filter, like tags~=python')
+    p.add_argument('-f', '--format', choices=['jsonl', 'csv'], default='jsonl',
+        help='output format (default: jsonl)')
+    p.add_argument('-e', '--ext', action='append', default=[],
+        help='comma-separated file extensions to read (default: {0})'.format(DEFAULT_EXTENSIONS))
+    p.add_argument('-j', '--jobs', type=int, default=0,
+        help='worker processes, 0 for one per CPU (default: 0)')
+    p.add_argument('--chunksize', type=int, default=64, help=argparse.SUPPRESS)
+    p.add_argument('--encoding', default='utf-8', help='file encoding (default: utf-8)')
+    p.add_argument('-o', '--output', help='write to a file instead of stdout')
+    p.add_argument('--stats', action='store_true',
+        help='print file counts and throughput to stderr')
+    return p
+
+
+def split(values):
+    "Flatten repeated, comma-separated options"
+    return [v.strip() for value in values for v in value.split(',') if v.strip()]
+
+
+def walk(paths, extensions):
+    "Yield files under ``paths`` with one of ``extensions``, in a stable order"
+    for path in paths:
+        if not os.path.isdir(path):
+            yield path
+            continue
+
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                if name.lower().endswith(extensions):
+                    yield os.path.join(root, name)
+
+
+class Where(object):
+    """
+    A --where filter, callable with metadata. This is a class rather than
+    a closure so it can be sent to worker processes.
+    """
+    def __init__(self, expression):
+        match = WHERE.match(expression)
+        if match is None:
+            raise ValueError('bad filter: {0}'.format(expression))
+
+        self.key, self.op, self.value = match.group('key', 'op', 'value')
+        self.key = self.key.strip()
+
+    def __call__(self, metadata):
+        if self.key not in metadata:
+            return self.op == '!='
+        if self.op is None:
+            return True
+
+        found = metadata[self.key]
+        items = found if isinstance(found, (list, tuple, set)) else [found]
+        items = [text(item) for item in items]
+
+        if self.op == '=':
+            return self.value in items
+        if self.op == '!=':
+            return self.value not in items
+        return any(self.value in item for item in items)
+
+
+def extract(path, encoding, keys, wheres):
+    """
+    Read one file's frontmatter. Returns ``(path, record, error)``, where
+    ``record`` is ``None`` if the post was filtered out.
+    """
+    try:
+        metadata = load(path, encoding, header_only=True).metadata
+    except Exception as e:
+        return path, None, '{0}: {1}'.format(type(e).__name__, e)
+
+    if not all(test(metadata) for test in wheres):
+        return path, None, None
+
+    record = {'path': path}
+    for key in (keys if keys is not None else metadata):
+        record[key] = metadata.get(key)
+    return path, record, None
+
+
+def text(value):
+    "Format a metadata value for filtering and CSV output"
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    if isinstance(value, (list, tuple, dict)):
+        return json.dumps(value, default=text, ensure_ascii=False)
+    return '{0}'.format(value)
+
+
+def writer(format, out, keys):
+    "Return a function that writes one record to ``out``"
+    if format == 'csv':
+        w = csv.writer(out)
+        fields = ['path'] + keys
+        w.writerow(fields)
+        return lambda record: w.writerow([text(record.get(k)) for k in fields])
+
+    def write_json(record):
+        out.write(json.dumps(record, default=text, ensure_ascii=False))
+        out.write('\n')
+
+    return write_json
@@ -0,0 +1,303 @@
+# -*- coding: utf-8 -*-
+"""
+A compact binary encoding for posts, for caches and passing posts between
+processes. See :py:meth:`Post.to_bytes <frontmatter.Post.to_bytes>`.
+
+Values are tagged with a single byte, integers and lengths are varints,
+and dates are stored as numbers, so encoded posts are smaller than pickled
+ones, and smaller again with compression. Only types that metadata parsers produce
+are supported: ``None``, booleans, numbers, text, bytes, lists, tuples,
+sets, dicts, dates, datetimes and times. Decoding never runs arbitrary code or
+imports anything, so it's safe for data from a shared cache. Posts with a
+custom handler can only be decoded once its class is registered with
+:py:func:`register_handler`.
+
+::
+
+    >>> from frontmatter.codec import encode, decode
+    >>> decode(encode({'title': 'Hello', 'tags': ['a', 'b']})) == {'title': 'Hello', 'tags': ['a', 'b']}
+    True
+
+"""
+from __future__ import unicode_literals
+
+import datetime
+import struct
+import zlib
+
+from .default_handlers import BaseHandler, YAMLHandler, JSONHandler, TOMLHandler
+
+
+__all__ = ['encode', 'decode', 'dumps', 'loads', 'register_handler']
+
+MAGIC = b'FM'
+VERSION = 1
+COMPRESSED = 1
+
+(NONE, TRUE, FALSE, INT, FLOAT, TEXT, BYTES, LIST, TUPLE, SET, DICT, DATE, DATETIME,
+ TIME) = range(14)
+
+FLOAT_STRUCT = struct.Struct('<d')
+
+HANDLERS = {'yaml': YAMLHandler, 'json': JSONHandler}
+if TOMLHandler is not None:
+    HANDLERS['toml'] = TOMLHandler
+
+HANDLER_NAMES = dict((cls, name) for name, cls in HANDLERS.items())
+
+try:
+    text_type, int_types = unicode, (int, long)  # python 2
+except NameError:
+    text_type, int_types = str, (int,)
+
+
+def encode(value):
+    "Encode a value as bytes"
+    out = bytearray()
+    _encode(value, out)
+    return bytes(out)
+
+
+def decode(data):
+    "Decode bytes made by :py:func:`encode`"
+    value, pos = _decode(bytearray(data), 0)
+    return value
+
+
+def dumps(post, compress=False):
+    """
+    Encode a :py:class:`post <frontmatter.Post>`: its handler, metadata,
+    content, and the raw frontmatter it was loaded from, unless that's
+    out of date. Pass ``compress``
+    to deflate the result with zlib, which pays off for long posts.
+    """
+    from . import _raw_frontmatter
+    payload = encode([
+        handler_name(getattr(post, 'handler', None)),
+        post.metadata,
+        post.content,
+        _raw_frontmatter(post),
+        getattr(post, '_offset', None),
+    ])
+
+    flags = 0
+    if compress:
+        payload = zlib.compress(payload)
+        flags |= COMPRESSED
+
+    return MAGIC + bytes(bytearray([VERSION, flags])) + payload
+
+
+def loads(data, cls=None):
+    "Decode a post made by :py:func:`dumps`, as ``cls`` (a Post by default)"
+    header = bytearray(data[:4])
+    if bytes(header[:2]) != MAGIC or len(header) < 4:
+        raise ValueError('Not an encoded post')
+    if header[2] != VERSION:
+        raise ValueError('Unsupported post encoding version: {0}'.format(header[2]))
+
+    payload = data[4:]
+    if header[3] & COMPRESSED:
+        payload = zlib.decompress(payload)
+
+    name, metadata, content, fm, offset = decode(payload)
+    return rebuild(cls, name, metadata, content, fm, offset)
+
+
+def rebuild(cls, handler, metadata, content, fm, offset):
+    """
+    Make a post from its parts; used by pickling as well as :py:func:`loads`.
+    ``handler`` is a handler name or instance.
+    """
+    if cls is None:
+        from . import Post as cls
+
+    if handler is None or isinstance(handler, text_type):
+        handler = handler_from_name(handler)
+
+    post = cls(content, handler, **metadata)
+    post._fm = fm
+    post._offset = offset
+    if fm is not None:
+        from . import _fingerprint
+        post._fingerprint = _fingerprint(post)
+    return post
+
+
+def register_handler(cls, name=None):
+    """
+    Allow posts using handler class ``cls`` to be decoded. Posts name their
+    handler's class when encoded, by ``name`` if it's registered with one
+    and otherwise by module and class.
+
+    ::
+
+        >>> from frontmatter.default_handlers import YAMLHandler
+        >>> class DraftHandler(YAMLHandler):
+        ...     pass
+        >>> register_handler(DraftHandler, 'draft')
+
+    """
+    if not (isinstance(cls, type) and issubclass(cls, BaseHandler)):
+        raise TypeError('Not a handler: {0!r}'.format(cls))
+    name = name or '{0}:{1}'.format(cls.__module__, cls.__name__)
+    HANDLERS[name] = cls
+    HANDLER_NAMES[cls] = name
+
+
+def handler_name(handler):
+    """
+    Name a handler's class, so it can be recreated. Built-in and registered
+    handlers get their registered names; others are named by module and
+    class. Settings passed to the handler when it was created are not kept.
+    """
+    if handler is None:
+        return None
+    cls = type(handler)
+    return HANDLER_NAMES.get(cls) or '{0}:{1}'.format(cls.__module__, cls.__name__)
+
+
+def is_default(handler):
+    "Check whether a built-in handler has its default settings"
+    cls = type(handler)
+    return cls in HANDLER_NAMES and all(
+        getattr(cls, k, None) == v for k, v in vars(handler).items())
+
+
+def handler_from_name(name):
+    """
+    Instantiate a handler named by :py:func:`handler_name`, with default
+    settings. Only built-in and registered handlers are allowed; names are
+    never imported.
+    """
+    if name is None:
+        return None
+    if name not in HANDLERS:
+        raise ValueError('Unknown handler {0}; see frontmatter.codec.register_handler'.format(
+            name))
+    return HANDLERS[name]()
+
+
+def _varint(n, out):
+    while n > 0x7f:
+        out.append((n & 0x7f) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def _read_varint(data, pos):
+    n = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        n |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return n, pos
+        shift += 7
+
+
+def _encode(value, out):
+    if value is None:
+        out.append(NONE)
+    elif value is True:
+        out.append(TRUE)
+    elif value is False:
+        out.append(FALSE)
+    elif isinstance(value, int_types):
+        out.append(INT)
+        _varint(value * 2 if value >= 0 else -value * 2 - 1, out)
+    elif isinstance(value, float):
+        out.append(FLOAT)
+        out += FLOAT_STRUCT.pack(value)
+    elif isinstance(value, text_type):
+        data = value.encode('utf-8')
+        out.append(TEXT)
+        _varint(len(data), out)
+        out += data
+    elif isinstance(value, (bytes, bytearray)):
+        out.append(BYTES)
+        _varint(len(value), out)
+        out += value
+    elif isinstance(value, dict):
+        out.append(DICT)
+        _varint(len(value), out)
+        for k, v in value.items():
+            _encode(k, out)
+            _encode(v, out)
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        out.append(LIST if isinstance(value, list) else TUPLE if isinstance(value, tuple) else SET)
+        _varint(len(value), out)
+        for v in value:
+            _encode(v, out)
+    elif isinstance(value, datetime.datetime):
+        out.append(DATETIME)
+        offset = value.utcoffset()
+        _encode([value.toordinal(), value.hour * 3600 + value.minute * 60 + value.second,
+                 value.microsecond,
+                 None if offset is None else offset.days * 86400 + offset.seconds], out)
+    elif isinstance(value, datetime.date):
+        out.append(DATE)
+        _varint(value.toordinal(), out)
+    elif isinstance(value, datetime.time):
+        out.append(TIME)
+        offset = value.utcoffset()
+        _encode([value.hour * 3600 + value.minute * 60 + value.second, value.microsecond,
+                 None if offset is None else offset.days * 86400 + offset.seconds], out)
+    else:
+        raise TypeError('Cannot encode {0!r}'.format(type(value)))
+
+
+def _decode(data, pos):
+    tag = data[pos]
+    pos += 1
+
+    if tag == TEXT:
+        n, pos = _read_varint(data, pos)
+        return data[pos:pos + n].decode('utf-8'), pos + n
+    if tag == INT:
+        n, pos = _read_varint(data, pos)
+        return (n >> 1) ^ -(n & 1), pos
+    if tag == NONE:
+        return None, pos
+    if tag == TRUE:
+        return True, pos
+    if tag == FALSE:
+        return False, pos
+    if tag == FLOAT:
+        return FLOAT_STRUCT.unpack_from(data, pos)[0], pos + FLOAT_STRUCT.size
+    if tag == BYTES:
+        n, pos = _read_varint(data, pos)
+        return bytes(data[pos:pos + n]), pos + n
+    if tag == DICT:
+        n, pos = _read_varint(data, pos)
+        result = {}
+        for _ in range(n):
+            k, pos = _decode(data, pos)
+            result[k], pos = _decode(data, pos)
+        return result, pos
+    if tag in (LIST, TUPLE, SET):
+        n, pos = _read_varint(data, pos)
+        items = []
+        for _ in range(n):
+            v, pos = _decode(data, pos)
+            items.append(v)
+        return items if tag == LIST else tuple(items) if tag == TUPLE else set(items), pos
+    if tag == DATE:
+        n, pos = _read_varint(data, pos)
+        return datetime.date.fromordinal(n), pos
+    if tag == DATETIME:
+        (ordinal, seconds, microsecond, offset), pos = _decode(data, pos)
+        value = datetime.datetime.fromordinal(ordinal) + datetime.timedelta(
+            seconds=seconds, microseconds=microsecond)
+        if offset is not None:
+            value = value.replace(tzinfo=datetime.timezone(datetime.timedelta(seconds=offset)))
+        return value, pos
+    if tag == TIME:
+        (seconds, microsecond, offset), pos = _decode(data, pos)
+        tzinfo = None
+        if offset is not None:
+            tzinfo = datetime.timezone(datetime.timedelta(seconds=offset))
+        return datetime.time(seconds // 3600, seconds // 60 % 60, seconds % 60, microsecond,
+                             tzinfo), pos
+
+    raise ValueError('Bad type tag {0} at byte {1}'.format(tag, pos - 1))
@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""
+Export metadata from many posts as columns, ready for analysis.
+
+Columns are built directly from posts as they stream past, so feeding in
+:py:func:`frontmatter.load_many <frontmatter.load_many>` never holds more
+than one post in memory::
+
+    >>> posts = frontmatter.load_many(['tests/hello-world.markdown', 'tests/hello-json.markdown'])
+    >>> columns = frontmatter.to_columns(posts, keys=['title', 'author'], arrays=False)
+    >>> columns['title'], columns['author']
+    (['Hello, world!', None], [None, 'bob'])
+
+If NumPy is installed, columns of numbers, booleans and dates become typed
+arrays; everything else stays a list. :py:func:`to_arrow` builds a
+``pyarrow.Table`` instead.
+"""
+from __future__ import unicode_literals
+
+
+__all__ = ['to_columns', 'to_arrow']
+
+CONTENT_LENGTH = 'content_length'
+BODY_OFFSET = 'body_offset'
+
+
+def to_columns(posts, keys=None, content_length=False, body_offset=False, arrays=None):
+    """
+    Turn an iterable of :py:class:`posts <frontmatter.Post>` into a dict of
+    columns, one per metadata key, with ``None`` where a post lacks a key.
+
+    ``keys`` picks which metadata to export. By default every key seen is
+    exported, in the order first seen.
+
+    ``content_length`` adds a column with the length of each post's content,
+    and ``body_offset`` one with the character offset where content starts
+    in the text it was loaded from (``None`` for posts built by hand).
+
+    ``arrays`` controls NumPy conversion: ``None`` converts if NumPy is
+    installed, ``True`` requires it and ``False`` always returns lists.
+    """
+    np = _numpy(arrays)
+    fixed = keys is not None
+    if fixed:
+        keys = list(keys)
+    columns = dict((key, []) for key in keys) if fixed else {}
+    order = keys if fixed else []
+    extras = []
+    if content_length:
+        extras.append(CONTENT_LENGTH)
+    if body_offset:
+        extras.append(BODY_OFFSET)
+    for key in extras:
+        columns[key] = []
+
+    count = 0
+    for post in posts:
+        metadata = post.metadata
+        if not fixed:
+            for key in metadata:
+                if key not in columns:
+                    columns[key] = [None] * count
+                    order.append(key)
+
+        for key in order:
+            columns[key].append(metadata.get(key))
+
+        if content_length:
+            columns[CONTENT_LENGTH].append(len(post.content))
+        if body_offset:
+            columns[BODY_OFFSET].append(getattr(post, '_offset', None))
+
+        count += 1
+
+    result = {}
+    for key in order + extras:
+        result[key] = _array(np, columns[key]) if np else columns[key]
+    return result
+
+
+def to_arrow(posts, keys=None, content_length=False, body_offset=False):
+    """
+    Like :py:func:`to_columns`, but return a ``pyarrow.Table``.
+    Arrow infers a type for each column; columns mixing types that Arrow
+    can't reconcile are stored as strings.
+    """
+    import pyarrow as pa
+
+    columns = to_columns(posts, keys, content_length, body_offset, arrays=False)
+    arrays, names = [], []
+    for key, values in columns.items():
+        try:
+            array = pa.array(values)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            array = pa.array([None if v is None else '{0}'.format(v) for v in values])
+        names.append('{0}'.format(key))
+        arrays.append(array)
+
+    return pa.Table.from_arrays(arrays, names=names)
+
+
+def _numpy(arrays):
+    "Import NumPy, if it's wanted and available"
+    if arrays is False:
+        return None
+    try:
+        import numpy
+    except ImportError:
+        if arrays:
+            raise
+        return None
+    return numpy
+
+
+def _array(np, values):
+    "Convert a column to a typed NumPy array, when its values allow"
+    import datetime
+
+    types = set(type(v) for v in values)
+    missing = type(None) in types
+    types.discard(type(None))
+
+    if not types:
+        return values
+
+    if types == set([bool]) and not missing:
+        return np.array(values, dtype=bool)
+
+    if types <= set([int, float]):
+        if types == set([int]) and not missing:
+            try:
+                return np.array(values, dtype='int64')
+            except OverflowError:  # too big for int64, so keep exact ints
+                return values
+        return np.array([np.nan if v is None else v for v in values], dtype='float64')
+
+    if types == set([datetime.date]):
+        return np.array(values, dtype='datetime64[D]')
+
+    if types == set([datetime.datetime]) and not any(v.tzinfo for v in values if v):
+        return np.array(values, dtype='datetime64[us]')
+
+    return values
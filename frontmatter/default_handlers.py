@@ -110,34 +110,291 @@ All handlers use the interface defined on ``BaseHandler``. Each handler needs to
 - parse plain text metadata into a Python dictionary (``handler.load``)
 - export a dictionary back into plain text (``handler.export``)
 
+Thread safety
+-------------
+
+Parsing and exporting are safe to run from many threads at once, sharing
+handlers. Handlers keep no state between calls, and their settings --
+``FM_BOUNDARY``, ``START_DELIMITER`` and ``END_DELIMITER`` -- can't be
+changed once a handler is created; make a new handler instead::
+
+    >>> handler = YAMLHandler()
+    >>> handler.START_DELIMITER = '+++'
+    Traceback (most recent call last):
+        ...
+    AttributeError: Handler settings can't be changed; create a new YAMLHandler instead
+
+Format detection works from a copy of ``frontmatter.handlers``, so
+registering a handler while other threads parse is safe, though those
+threads may not see it straight away. Posts themselves aren't locked:
+don't change one post from several threads.
 
 """
 from __future__ import unicode_literals
 
-import json
+import datetime
 import re
-import yaml
-try:
-    from yaml import CSafeDumper as SafeDumper
-    from yaml import CSafeLoader as SafeLoader
-except ImportError:
-    from yaml import SafeDumper
-    from yaml import SafeLoader
 
 try:
-    import toml
-except ImportError:
-    toml = None
+    from importlib.util import find_spec
+except ImportError:  # python 2
+    from pkgutil import find_loader as find_spec
 
+from .limits import LimitError, clock
 from .util import u
 
 
 __all__ = ['BaseHandler', 'YAMLHandler', 'JSONHandler']
 
-if toml:
+# backends are imported the first time a handler needs them, so that
+# importing frontmatter doesn't pay for PyYAML or toml up front
+yaml = SafeLoader = SafeDumper = None
+toml = None
+
+TOML_INSTALLED = find_spec('toml') is not None
+
+if TOML_INSTALLED:
     __all__.append('TOMLHandler')
 
 
+def import_yaml():
+    """
+    Import PyYAML, preferring the C-based safe loader and dumper.
+    Returns the ``yaml`` module.
+    """
+    global yaml, SafeLoader, SafeDumper
+    if yaml is None:
+        import yaml as _yaml
+        try:
+            from yaml import CSafeDumper as SafeDumper
+            from yaml import CSafeLoader as SafeLoader
+        except ImportError:
+            from yaml import SafeDumper
+            from yaml import SafeLoader
+
+        # set this last, so other threads never see it without the rest
+        yaml = _yaml
+    return yaml
+
+
+def import_toml():
+    "Import toml, returning the module"
+    global toml
+    if toml is None:
+        import toml as _toml
+        toml = _toml
+    return toml
+
+
+def select_keys(metadata, keys):
+    "Pick ``keys`` out of parsed metadata, if it's a dict"
+    if not isinstance(metadata, dict):
+        return metadata
+    return dict((k, metadata[k]) for k in keys if k in metadata)
+
+
+TIMESTAMP_TAG = 'tag:yaml.org,2002:timestamp'
+
+_timestamp_classes = {}
+
+
+def timestamp_classes(timestamps):
+    """
+    Return the YAML loader and dumper classes for a ``timestamps`` mode of
+    :py:class:`YAMLHandler`. Classes are built once per mode, on top of the
+    safe loader and dumper.
+    """
+    import_yaml()
+    if timestamps == 'datetime':
+        return SafeLoader, SafeDumper
+
+    if timestamps not in _timestamp_classes:
+        if timestamps == 'string':
+            classes = (_without_timestamps(SafeLoader), _without_timestamps(SafeDumper))
+        else:
+            constructors = dict(SafeLoader.yaml_constructors)
+            constructors[TIMESTAMP_TAG] = construct_fast_timestamp
+            loader = type(str('Fast' + SafeLoader.__name__), (SafeLoader,),
+                          {'yaml_constructors': constructors})
+            classes = (loader, SafeDumper)
+        _timestamp_classes.setdefault(timestamps, classes)
+
+    return _timestamp_classes[timestamps]
+
+
+def _without_timestamps(cls):
+    "Subclass a YAML loader or dumper so it doesn't resolve timestamps"
+    resolvers = dict(
+        (first, [(tag, regexp) for tag, regexp in items if tag != TIMESTAMP_TAG])
+        for first, items in cls.yaml_implicit_resolvers.items())
+    return type(str('NoTimestamp' + cls.__name__), (cls,), {'yaml_implicit_resolvers': resolvers})
+
+
+def construct_fast_timestamp(loader, node):
+    """
+    Build a date or datetime with ``fromisoformat``, falling back to
+    PyYAML's constructor for forms it doesn't handle, like a space before
+    the timezone
+    """
+    value = loader.construct_scalar(node)
+    try:
+        if len(value) == 10:
+            return datetime.date.fromisoformat(value)
+        return datetime.datetime.fromisoformat(value)
+    except (AttributeError, ValueError):  # no fromisoformat before python 3.7
+        from yaml.constructor import SafeConstructor
+        return SafeConstructor.construct_yaml_timestamp(loader, node)
+
+
+class MergeKeys(Exception):
+    "Raised when selecting keys from YAML that uses merge keys"
+
+
+_selective_loaders = {}
+
+
+def selective_loader(Loader):
+    """
+    Return a subclass of the YAML ``Loader`` class that can compose and
+    construct top-level values one at a time. PyYAML's C loader doesn't
+    expose node composition, so the pure Python composer is mixed in; it
+    still reads events from the C parser.
+    """
+    if Loader not in _selective_loaders:
+        from yaml.composer import Composer
+        # threads may race to build this; setdefault makes sure they all
+        # end up with the same class
+        _selective_loaders.setdefault(Loader, type(
+            str('Selective' + Loader.__name__), (Loader, Composer, SelectiveMixin), {}))
+    return _selective_loaders[Loader]
+
+
+class SelectiveMixin(object):
+    "Key selection for a YAML loader. See :py:func:`selective_loader`."
+
+    def select(self, wanted):
+        from yaml.events import (AliasEvent, CollectionEndEvent, CollectionStartEvent,
+            DocumentStartEvent, MappingEndEvent, MappingStartEvent)
+
+        self.anchors = {}
+        self.get_event()  # stream start
+        if not self.check_event(DocumentStartEvent):
+            return None
+        self.get_event()
+
+        if not self.check_event(MappingStartEvent):
+            return select_keys(self.construct_document(self.compose_node(None, None)), wanted)
+        self.get_event()
+
+        result = {}
+        while wanted and not self.check_event(MappingEndEvent):
+            key_node = self.compose_node(None, None)
+            if key_node.tag == 'tag:yaml.org,2002:merge':
+                raise MergeKeys()
+
+            key = self.construct_object(key_node, deep=True)
+            try:
+                selected = key in wanted
+            except TypeError:  # unhashable key
+                selected = False
+
+            if selected:
+                wanted.discard(key)
+                value_node = self.compose_node(None, None)
+                result[key] = self.construct_object(value_node, deep=True)
+                continue
+
+            # skip the value, keeping anchors in case they're used later
+            depth = 0
+            while True:
+                event = self.peek_event()
+                if not isinstance(event, AliasEvent) and getattr(event, 'anchor', None):
+                    self.compose_node(None, None)
+                else:
+                    self.get_event()
+                    if isinstance(event, CollectionStartEvent):
+                        depth += 1
+                    elif isinstance(event, CollectionEndEvent):
+                        depth -= 1
+                if depth == 0:
+                    break
+
+        return result
+
+
+_limited_loaders = {}
+
+
+def limited_loader(Loader):
+    """
+    Return a subclass of the YAML ``Loader`` class that enforces
+    :py:class:`Limits <frontmatter.limits.Limits>` while composing nodes.
+    As with :py:func:`selective_loader`, the pure Python composer is mixed
+    in so each node passes through Python.
+    """
+    if Loader not in _limited_loaders:
+        from yaml.composer import Composer
+        from yaml.events import AliasEvent, MappingStartEvent, SequenceStartEvent
+        _limited_loaders.setdefault(Loader, type(
+            str('Limited' + Loader.__name__), (LimitMixin, Loader, Composer), {
+                'AliasEvent': AliasEvent,
+                # the C parser matches exact event classes, not subclasses
+                'COLLECTION_EVENTS': (MappingStartEvent, SequenceStartEvent),
+            }))
+    return _limited_loaders[Loader]
+
+
+class LimitMixin(object):
+    "Limits for a YAML loader. See :py:func:`limited_loader`."
+
+    def load_limited(self, limits):
+        from yaml.composer import Composer
+
+        self.anchors = {}
+        self.limits = limits
+        self.deadline = limits.deadline()
+        self.depth = 0
+        self.repeated = 0
+        self.sizes = {}  # id(node) -> nodes in it, for counting aliases
+
+        node = Composer.get_single_node(self)
+        if node is None:
+            return None
+        data = self.construct_document(node)
+        limits.check_time(self.deadline)
+        return data
+
+    def compose_node(self, parent, index):
+        limits = self.limits
+        if self.deadline is not None and clock() > self.deadline:
+            raise LimitError('seconds', limits.seconds)
+
+        alias = self.check_event(self.AliasEvent)
+        self.depth += 1
+        try:
+            if limits.depth is not None and self.depth > limits.depth \
+                    and self.check_event(*self.COLLECTION_EVENTS):
+                raise LimitError('depth', limits.depth)
+            node = super(LimitMixin, self).compose_node(parent, index)
+        finally:
+            self.depth -= 1
+
+        if limits.aliases is None:
+            return node
+
+        sizes = self.sizes
+        if alias:
+            self.repeated += sizes.get(id(node), 1)
+            if self.repeated > limits.aliases:
+                raise LimitError('aliases', limits.aliases)
+        elif isinstance(node.value, list):
+            children = node.value
+            if children and isinstance(children[0], tuple):  # mapping pairs
+                children = [child for pair in children for child in pair]
+            sizes[id(node)] = 1 + sum(sizes.get(id(child), 1) for child in children)
+        return node
+
+
 class BaseHandler(object):
     """
     BaseHandler lays out all the steps to detecting, splitting, parsing and 
@@ -150,6 +407,8 @@ class BaseHandler(object):
     START_DELIMITER = None
     END_DELIMITER = None
 
+    SETTINGS = ('FM_BOUNDARY', 'START_DELIMITER', 'END_DELIMITER')
+
     def __init__(self, fm_boundary=None, start_delimiter=None, end_delimiter=None):
         self.FM_BOUNDARY = fm_boundary or self.FM_BOUNDARY
         self.START_DELIMITER = start_delimiter or self.START_DELIMITER
@@ -159,6 +418,13 @@ class BaseHandler(object):
             raise NotImplementedError('No frontmatter boundary defined. '
                 'Please set {}.FM_BOUNDARY to a regular expression'.format(self.__class__.__name__))
 
+    def __setattr__(self, name, value):
+        # settings are fixed once set in __init__, so handlers can be shared
+        if name in self.SETTINGS and name in self.__dict__:
+            raise AttributeError("Handler settings can't be changed; create a new {0} instead"
+                                 .format(self.__class__.__name__))
+        super(BaseHandler, self).__setattr__(name, value)
+
     def detect(self, text):
         """
         Decide whether this handler can parse the given ``text``,
@@ -184,6 +450,28 @@ class BaseHandler(object):
         """
         raise NotImplementedError
 
+    def load_keys(self, fm, keys, **kwargs):
+        """
+        Parse frontmatter and return a dict of only the top-level ``keys``
+        that are present. By default this loads everything and then picks
+        keys out; handlers that can skip unwanted values should override it.
+        """
+        return select_keys(self.load(fm, **kwargs), keys)
+
+    def load_limited(self, fm, limits, **kwargs):
+        """
+        Parse frontmatter within :py:class:`Limits <frontmatter.limits.Limits>`,
+        raising :py:class:`LimitError <frontmatter.limits.LimitError>` if
+        it goes over. By default this loads everything, then checks the
+        time taken and the nesting depth; handlers that can stop early
+        should override it.
+        """
+        deadline = limits.deadline()
+        metadata = self.load(fm, **kwargs)
+        limits.check_time(deadline)
+        limits.check_depth(metadata)
+        return metadata
+
     def export(self, metadata, **kwargs):
         """
         Turn metadata back into text
@@ -195,22 +483,91 @@ class YAMLHandler(BaseHandler):
     """
     Load and export YAML metadata. By default, this handler uses YAML's
     "safe" mode, though it's possible to override that.
+
+    ``timestamps`` controls how dates and times are read:
+
+    - ``'datetime'``, the default, builds ``date`` and ``datetime`` objects
+      with PyYAML's own resolver and constructor
+    - ``'fast'`` builds the same objects with ``fromisoformat``, skipping
+      PyYAML's regex-based constructor
+    - ``'string'`` leaves timestamps as strings, and exports strings that
+      look like timestamps without quotes, so they round trip unchanged
+
+    ::
+
+        >>> handler = YAMLHandler(timestamps='string')
+        >>> handler.load('date: 2020-01-02')
+        {'date': '2020-01-02'}
+        >>> print(handler.export({'date': '2020-01-02'}))
+        date: 2020-01-02
+
     """
     FM_BOUNDARY = re.compile(r'^-{3,}$', re.MULTILINE)
     START_DELIMITER = END_DELIMITER = "---"
 
+    SETTINGS = BaseHandler.SETTINGS + ('timestamps',)
+    TIMESTAMPS = ('datetime', 'fast', 'string')
+
+    timestamps = 'datetime'
+
+    def __init__(self, fm_boundary=None, start_delimiter=None, end_delimiter=None,
+                 timestamps='datetime'):
+        if timestamps not in self.TIMESTAMPS:
+            raise ValueError('timestamps must be one of {0}'.format(', '.join(self.TIMESTAMPS)))
+
+        super(YAMLHandler, self).__init__(fm_boundary, start_delimiter, end_delimiter)
+        self.timestamps = timestamps
+
     def load(self, fm, **kwargs):
         """
-        Parse YAML front matter. This uses yaml.SafeLoader by default. 
+        Parse YAML front matter. This uses yaml.SafeLoader by default,
+        adjusted for ``timestamps``.
         """
-        kwargs.setdefault('Loader', SafeLoader)
+        yaml = import_yaml()
+        if 'Loader' not in kwargs:
+            kwargs['Loader'] = timestamp_classes(self.timestamps)[0]
         return yaml.load(fm, **kwargs)
 
+    def load_keys(self, fm, keys, **kwargs):
+        """
+        Parse only the top-level ``keys`` from YAML front matter.
+
+        This walks YAML's event stream: values for other keys are skipped
+        without building Python objects, and parsing stops as soon as every
+        key is found. Documents using merge keys (``<<``) are loaded in full.
+        """
+        Loader = selective_loader(kwargs.get('Loader') or timestamp_classes(self.timestamps)[0])
+        loader = Loader(fm)
+        try:
+            return loader.select(set(keys))
+        except MergeKeys:
+            pass
+        finally:
+            loader.dispose()
+
+        return BaseHandler.load_keys(self, fm, keys, **kwargs)
+
+    def load_limited(self, fm, limits, **kwargs):
+        """
+        Parse YAML front matter within ``limits``, checking each node as
+        it's composed, so alias bombs and deep nesting fail before they're
+        built.
+        """
+        Loader = limited_loader(kwargs.get('Loader') or timestamp_classes(self.timestamps)[0])
+        loader = Loader(fm)
+        try:
+            return loader.load_limited(limits)
+        finally:
+            loader.dispose()
+
     def export(self, metadata, **kwargs):
         """
-        Export metadata as YAML. This uses yaml.SafeDumper by default.
+        Export metadata as YAML. This uses yaml.SafeDumper by default,
+        adjusted for ``timestamps``.
         """
-        kwargs.setdefault('Dumper', SafeDumper)
+        yaml = import_yaml()
+        if 'Dumper' not in kwargs:
+            kwargs['Dumper'] = timestamp_classes(self.timestamps)[1]
         kwargs.setdefault('default_flow_style', False)
         kwargs.setdefault('allow_unicode', True)
 
@@ -223,26 +580,84 @@ class JSONHandler(BaseHandler):
     Load and export JSON metadata.
 
     Note that changing ``START_DELIMITER`` or ``END_DELIMITER`` may break JSON parsing.
+
+    ``FM_BOUNDARY`` is only used to detect JSON frontmatter. The end of the
+    header is found by counting braces outside strings, so nested objects
+    work and the body is never scanned.
     """
     FM_BOUNDARY = re.compile(r'^(?:{|})$', re.MULTILINE)
     START_DELIMITER = ""
     END_DELIMITER = ""
 
+    TOKENS = re.compile(r'"(?:[^"\\]|\\.)*"|[{}]')
+    NESTING = re.compile(r'"(?:[^"\\]|\\.)*"|[][{}]')
+
     def split(self, text):
-        _, fm, content = self.FM_BOUNDARY.split(text, 2)
-        return "{" + fm + "}", content
+        if not text.startswith('{'):
+            raise ValueError('JSON frontmatter must start with {')
+
+        end, depth = self.scan(text)
+        if end is None:
+            raise ValueError('Unterminated JSON frontmatter')
+        return text[:end], text[end:]
+
+    def scan(self, text, depth=0):
+        """
+        Look for the end of a JSON object in ``text``, starting ``depth``
+        braces deep. Returns the offset just past the closing brace (or
+        ``None`` if it isn't there) and the depth reached.
+
+        JSON strings can't contain raw newlines, so text can be scanned a
+        line at a time, passing the depth along::
+
+            >>> handler = JSONHandler()
+            >>> handler.scan('{"a": {"b": "}"}')
+            (None, 1)
+            >>> handler.scan('}\\nbody', 1)
+            (1, 0)
+
+        """
+        for match in self.TOKENS.finditer(text):
+            token = match.group()
+            if token == '{':
+                depth += 1
+            elif token == '}':
+                depth -= 1
+                if depth == 0:
+                    return match.end(), depth
+        return None, depth
 
     def load(self, fm, **kwargs):
+        import json
         return json.loads(fm, **kwargs)
 
+    def load_limited(self, fm, limits, **kwargs):
+        """
+        Parse JSON front matter within ``limits``. Nesting is checked by
+        scanning brackets before anything is parsed.
+        """
+        if limits.depth is not None:
+            depth = 0
+            for match in self.NESTING.finditer(fm):
+                token = match.group()
+                if token in '{[':
+                    depth += 1
+                    if depth > limits.depth:
+                        raise LimitError('depth', limits.depth)
+                elif token in '}]':
+                    depth -= 1
+
+        return BaseHandler.load_limited(self, fm, limits, **kwargs)
+
     def export(self, metadata, **kwargs):
         "Turn metadata into JSON"
+        import json
         kwargs.setdefault('indent', 4)
         metadata = json.dumps(metadata, **kwargs)
         return u(metadata)
 
 
-if toml:
+if TOML_INSTALLED:
     class TOMLHandler(BaseHandler):
         """
         Load and export TOML metadata.
@@ -253,11 +668,11 @@ if toml:
         START_DELIMITER = END_DELIMITER = "+++"
 
         def load(self, fm, **kwargs):
-            return toml.loads(fm, **kwargs)
+            return import_toml().loads(fm, **kwargs)
 
         def export(self, metadata, **kwargs):
             "Turn metadata into TOML"
-            metadata = toml.dumps(metadata)
+            metadata = import_toml().dumps(metadata)
             return u(metadata)
 
 else:
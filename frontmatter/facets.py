@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""
+Count metadata values across a whole corpus -- tags, categories, posts per
+month -- without holding any posts in memory.
+
+Files are read header-only in chunks, each chunk is counted on its own
+(in a worker process, if you like) and the partial counts are merged, so
+memory grows with the number of distinct values, not the number of posts::
+
+    >>> counts = frontmatter.aggregate(['tests/hello-world.markdown', 'tests/chinese.txt'],
+    ...                                facets=['layout', 'title'])
+    >>> counts['layout']
+    Counter({'post': 1})
+
+A facet is a metadata key. Lists are counted item by item. Add ``:year``,
+``:month`` or ``:day`` to a key holding dates to count by period instead,
+as in ``date:month``, which counts keys like ``'2020-01'``. Values that
+aren't dates, datetimes or ISO-8601 date strings aren't counted by period.
+"""
+from __future__ import unicode_literals
+
+import collections
+import datetime
+import functools
+import itertools
+import re
+
+from . import load
+from .batch import _imap
+
+
+__all__ = ['aggregate']
+
+PERIODS = {'year': 4, 'month': 7, 'day': 10}
+
+ISO_DATE = re.compile(r'\d{4}(?:-\d{2}(?:-\d{2})?)?(?!\d)')
+
+
+def aggregate(paths, facets, encoding='utf-8', handler=None, processes=None,
+              chunksize=256):
+    """
+    Count the values of each of ``facets`` across the files in ``paths``,
+    returning a dict of ``collections.Counter`` objects keyed by facet.
+
+    Files are taken ``chunksize`` at a time. Set ``processes`` to count
+    chunks in a pool of worker processes (``0`` uses one per CPU).
+    """
+    facets = [_facet(spec) for spec in facets]
+    worker = functools.partial(_count, facets=facets, encoding=encoding, handler=handler)
+    chunks = _chunks(paths, chunksize)
+
+    if processes is None:
+        results = (worker(chunk) for chunk in chunks)
+    else:
+        results = _imap(worker, chunks, processes, 1)
+
+    totals = dict((spec, collections.Counter()) for spec, key, period in facets)
+    for counts in results:
+        for spec, counter in counts.items():
+            totals[spec].update(counter)
+    return totals
+
+
+def _facet(spec):
+    """
+    Split a facet into ``(spec, key, period)``. Keys may contain colons,
+    as in ``og:title``, so only a known period after the last one counts.
+    """
+    key, _, period = spec.rpartition(':')
+    if not key or period not in PERIODS:
+        return spec, spec, None
+    return spec, key, period
+
+
+def _chunks(paths, size):
+    paths = iter(paths)
+    while True:
+        chunk = list(itertools.islice(paths, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _count(chunk, facets, encoding, handler):
+    "Count facets for one chunk of files"
+    keys = list(set(key for spec, key, period in facets))
+    counts = dict((spec, collections.Counter()) for spec, key, period in facets)
+
+    for path in chunk:
+        metadata = load(path, encoding, handler, header_only=True, keys=keys).metadata
+        for spec, key, period in facets:
+            if key not in metadata:
+                continue
+
+            values = metadata[key]
+            if not isinstance(values, (list, tuple, set)):
+                values = [values]
+
+            counter = counts[spec]
+            for value in values:
+                if value is None:
+                    continue
+                if period is not None:
+                    value = _period(value, period)
+                    if value is None:
+                        continue
+                try:
+                    counter[value] += 1
+                except TypeError:  # unhashable, like a nested mapping
+                    pass
+
+    return counts
+
+
+def _period(value, period):
+    """
+    Truncate a date, datetime or ISO date string to ``period``, or return
+    ``None`` for anything else
+    """
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        value = value.isoformat()
+    elif not isinstance(value, type('')):
+        return None
+
+    size = PERIODS[period]
+    match = ISO_DATE.match(value)
+    if match is None or match.end() < size:
+        return None
+    return value[:size]
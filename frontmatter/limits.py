@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+Limits stop a single pathological file -- a huge header, deeply nested
+values or a YAML "billion laughs" alias bomb -- from tying up a worker.
+Pass them to :py:func:`frontmatter.load <frontmatter.load>` and friends as
+a :py:class:`Limits` object or a dict::
+
+    >>> bomb = '''---
+    ... a: &a [x, x, x, x, x, x, x, x, x, x]
+    ... b: &b [*a, *a, *a, *a, *a, *a, *a, *a, *a, *a]
+    ... c: &c [*b, *b, *b, *b, *b, *b, *b, *b, *b, *b]
+    ... ---
+    ... '''
+    >>> frontmatter.loads(bomb, limits={'aliases': 100})
+    Traceback (most recent call last):
+        ...
+    frontmatter.limits.LimitError: frontmatter exceeds the aliases limit of 100
+
+YAML is checked as it's parsed, so a bad header fails as soon as it
+crosses a limit. Other formats are checked for size and nesting before
+parsing (JSON) or after (everything else).
+"""
+from __future__ import unicode_literals
+
+import time
+
+
+__all__ = ['Limits', 'LimitError']
+
+clock = getattr(time, 'monotonic', time.time)
+
+
+class LimitError(ValueError):
+    """
+    Raised when frontmatter goes over one of its :py:class:`Limits`.
+
+    ``limit`` names the limit, ``maximum`` is its value, and ``filename``
+    is set when the post was loaded from a file.
+    """
+    def __init__(self, limit, maximum, filename=None):
+        super(LimitError, self).__init__(limit, maximum, filename)
+        self.limit = limit
+        self.maximum = maximum
+        self.filename = filename
+
+    def __str__(self):
+        message = 'frontmatter exceeds the {0} limit of {1}'.format(self.limit, self.maximum)
+        if self.filename:
+            return '{0}: {1}'.format(self.filename, message)
+        return message
+
+
+class Limits(object):
+    """
+    Resource limits for parsing one header. Each defaults to ``None``, for
+    no limit.
+
+    - ``header_size``: the most bytes of frontmatter, encoded as UTF-8
+    - ``depth``: the deepest nesting of lists and mappings, where the
+      top-level mapping is depth 1
+    - ``aliases``: the most YAML nodes that aliases may repeat, counting
+      each alias as the size of the value it refers to
+    - ``seconds``: how long parsing may take
+    """
+    def __init__(self, header_size=None, depth=None, aliases=None, seconds=None):
+        self.header_size = header_size
+        self.depth = depth
+        self.aliases = aliases
+        self.seconds = seconds
+
+    @classmethod
+    def compile(cls, limits):
+        "Return ``limits`` as Limits, building them from a dict if needed"
+        if isinstance(limits, cls):
+            return limits
+        return cls(**limits)
+
+    def check_size(self, fm):
+        "Check the size of raw frontmatter text"
+        maximum = self.header_size
+        if maximum is None:
+            return
+
+        # each character is one to four bytes, so only encode if it matters
+        size = len(fm)
+        if size > maximum or (size * 4 > maximum and len(fm.encode('utf-8')) > maximum):
+            raise LimitError('header_size', maximum)
+
+    def deadline(self):
+        "When parsing that starts now must finish, or ``None``"
+        if self.seconds is None:
+            return None
+        return clock() + self.seconds
+
+    def check_time(self, deadline):
+        if deadline is not None and clock() > deadline:
+            raise LimitError('seconds', self.seconds)
+
+    def check_depth(self, value):
+        "Check how deeply parsed metadata is nested"
+        if self.depth is None:
+            return
+
+        stack = [(value, 1)]
+        while stack:
+            value, depth = stack.pop()
+            if isinstance(value, dict):
+                value = list(value.values())
+            elif not isinstance(value, (list, tuple)):
+                continue
+
+            if depth > self.depth:
+                raise LimitError('depth', self.depth)
+            stack.extend((v, depth + 1) for v in value)
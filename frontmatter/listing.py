@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+"""
+List posts in order of a metadata key -- the latest posts on a blog's
+front page, say -- without loading every body.
+
+Only headers are parsed to rank posts, and only the posts that make the
+cut are loaded in full. :py:func:`top <frontmatter.top>` does this once;
+a :py:class:`Listing` keeps its sorted index of keys, so paging through
+it parses each header once::
+
+    >>> from frontmatter.listing import Listing
+    >>> listing = Listing('tests', 'title', reverse=False)
+    >>> page = listing.page(2)
+    >>> [post['title'] for path, post in page.posts]
+    ['Hello, world!', "Let's try unicode"]
+    >>> page = listing.page(2, page.cursor)
+    >>> [post['title'] for path, post in page.posts], page.cursor
+    (['TODO: Understand Network Diagrams'], None)
+
+Posts without the key are left out. Values of different types are kept
+apart rather than compared: numbers sort first, then dates and times,
+then text, then anything else by its text. Dates sort alongside
+datetimes, as midnight on that day, and datetimes with a timezone are
+compared in UTC, taking naive ones to be UTC already.
+"""
+from __future__ import unicode_literals
+
+import bisect
+import collections
+import datetime
+import fnmatch
+import heapq
+import numbers
+import os
+
+from . import EXTENSIONS, load
+from .batch import load_many
+
+
+__all__ = ['top', 'Listing', 'Page']
+
+Page = collections.namedtuple('Page', ['posts', 'cursor'])
+Page.__doc__ = """
+One page of a :py:class:`Listing`. ``posts`` is a list of ``(path, post)``
+pairs, and ``cursor`` is passed to :py:meth:`Listing.page` to get the next
+page, or is ``None`` on the last one.
+"""
+
+
+def top(source, key, n=20, reverse=True, match=None, encoding='utf-8', handler=None,
+        processes=None, chunksize=16, **kwargs):
+    """
+    Find the ``n`` posts with the highest values of ``key`` (the lowest,
+    if ``reverse`` is false), returning ``(path, post)`` pairs in order.
+
+    ``source`` is a directory, searched recursively for files matching the
+    glob pattern ``match`` (by default, files with the same extensions as
+    the command line tool reads), or a list of filenames. Headers are parsed as
+    they stream past, with ``processes`` as in
+    :py:func:`load_many <frontmatter.load_many>`, and only ``n`` are kept
+    at a time. The winners are then loaded in full; other keyword
+    arguments are passed to :py:func:`load <frontmatter.load>`.
+
+    ::
+
+        >>> [path for path, post in frontmatter.top('tests', 'title', 2)]
+        ['tests/network-diagrams.markdown', 'tests/chinese.txt']
+
+    """
+    paths = list(_paths(source, match))
+    headers = load_many(paths, encoding, handler, header_only=True, keys=[key],
+                        processes=processes, chunksize=chunksize)
+    entries = _entries(paths, headers, key)
+
+    winners = heapq.nlargest(n, entries) if reverse else heapq.nsmallest(n, entries)
+    return [(path, load(path, encoding, handler, **kwargs)) for value, path in winners]
+
+
+class Listing(object):
+    """
+    Posts from ``source`` sorted by ``key``, highest first unless
+    ``reverse`` is false, to be read a page at a time. ``source``,
+    ``match`` and other arguments are as for :py:func:`top`.
+
+    The index of keys is built on first use and kept until
+    :py:meth:`refresh` is called, so each page only costs a full load of
+    the posts on it.
+    """
+    def __init__(self, source, key, reverse=True, match=None, encoding='utf-8',
+                 handler=None, processes=None, **kwargs):
+        self.source = source
+        self.key = key
+        self.reverse = reverse
+        self.match = match
+        self.encoding = encoding
+        self.handler = handler
+        self.processes = processes
+        self.kwargs = kwargs
+        self._index = None  # sorted [(value, path)]
+        self._stats = {}    # path -> (mtime, size, value)
+
+    def __len__(self):
+        return len(self.index)
+
+    @property
+    def index(self):
+        "Sorted ``(value, path)`` pairs, lowest first"
+        if self._index is None:
+            self.refresh()
+        return self._index
+
+    def refresh(self):
+        """
+        Bring the index up to date, parsing headers only for files that
+        are new or changed since it was last built.
+        """
+        stats = {}
+        changed = []
+        for path in _paths(self.source, self.match):
+            stat = os.stat(path)
+            old = self._stats.get(path)
+            if old is not None and old[:2] == (stat.st_mtime, stat.st_size):
+                stats[path] = old
+            else:
+                stats[path] = (stat.st_mtime, stat.st_size, None)
+                changed.append(path)
+
+        headers = load_many(changed, self.encoding, self.handler, header_only=True,
+                            keys=[self.key], processes=self.processes)
+        for value, path in _entries(changed, headers, self.key):
+            stats[path] = stats[path][:2] + (value,)
+
+        self._stats = stats
+        self._index = sorted((value, path) for path, (mtime, size, value) in stats.items()
+                             if value is not None)
+
+    def page(self, size=20, cursor=None):
+        """
+        Load a page of up to ``size`` posts, starting after ``cursor`` or
+        from the top. Returns a :py:class:`Page`.
+
+        Cursors point between posts rather than at a position, so posts
+        added or removed before the cursor don't shift the pages after it.
+        """
+        index = self.index
+        if self.reverse:
+            end = len(index) if cursor is None else bisect.bisect_left(index, cursor)
+            start = max(end - size, 0)
+            entries = index[start:end][::-1]
+            more = start > 0
+        else:
+            start = 0 if cursor is None else bisect.bisect_right(index, cursor)
+            entries = index[start:start + size]
+            more = start + size < len(index)
+
+        posts = [(path, load(path, self.encoding, self.handler, **self.kwargs))
+                 for value, path in entries]
+        return Page(posts, entries[-1] if entries and more else None)
+
+
+def _paths(source, match):
+    "Yield files under a directory in a stable order, or the given filenames"
+    if not isinstance(source, (str, type(''))) or not os.path.isdir(source):
+        for path in source:
+            yield path
+        return
+
+    for root, dirs, files in os.walk(source):
+        dirs.sort()
+        for name in sorted(files):
+            if match is None:
+                wanted = name.lower().endswith(EXTENSIONS)
+            else:
+                wanted = fnmatch.fnmatch(name, match)
+            if wanted:
+                yield os.path.join(root, name)
+
+
+def _entries(paths, posts, key):
+    "Yield ``(value, path)`` for each post that has ``key``"
+    for path, post in zip(paths, posts):
+        value = post.get(key)
+        if value is not None:
+            yield _sortable(value), path
+
+
+def _sortable(value):
+    "Make a key for ``value`` that sorts against values of any other type"
+    if isinstance(value, numbers.Real):
+        return 0, value
+    if isinstance(value, datetime.datetime):
+        offset = value.utcoffset()
+        if offset is not None:
+            value = value.replace(tzinfo=None) - offset
+        return 1, value
+    if isinstance(value, datetime.date):
+        return 1, datetime.datetime.combine(value, datetime.time())
+    if isinstance(value, type('')):
+        return 2, value
+    return 3, '{0!r}'.format(value)
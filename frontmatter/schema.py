@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+"""
+Schemas validate and coerce metadata while a post is being loaded, so
+values like dates, numbers and tag lists come out of
+:py:func:`frontmatter.load <frontmatter.load>` with the right types.
+
+A schema maps metadata keys to types. Each type is turned into a coercion
+function once, when the schema is created, and reused for every post::
+
+    >>> import datetime
+    >>> from frontmatter.schema import Schema
+    >>> schema = Schema({'date': datetime.date, 'tags': [str]}, required=['title'])
+    >>> post = frontmatter.loads('---\\ntitle: Hi\\ndate: "2017-01-02"\\ntags: python\\n---\\n', schema=schema)
+    >>> post['date']
+    datetime.date(2017, 1, 2)
+    >>> post['tags']
+    ['python']
+
+Supported types are ``str``, ``int``, ``float``, ``bool``,
+``datetime.date`` and ``datetime.datetime``. A one-item list like ``[int]``
+means "a list of ints", and a lone value is wrapped in a list. Any other
+callable is used as-is and may raise ``ValueError`` or ``TypeError`` to
+reject a value.
+
+A null value, like ``title:`` with nothing after it, is left as ``None``
+whatever its type, and counts as missing for a required key. Nulls inside
+lists are rejected.
+
+All problems in a post are collected and raised together as a
+:py:class:`SchemaError`.
+"""
+from __future__ import unicode_literals
+
+import datetime
+
+
+__all__ = ['Schema', 'SchemaError']
+
+TRUE = frozenset(['true', 'yes', 'on', '1'])
+FALSE = frozenset(['false', 'no', 'off', '0'])
+
+DATETIME_FORMATS = (
+    '%Y-%m-%dT%H:%M:%S',
+    '%Y-%m-%d %H:%M:%S',
+    '%Y-%m-%dT%H:%M',
+    '%Y-%m-%d %H:%M',
+    '%Y-%m-%d',
+)
+
+
+class SchemaError(ValueError):
+    """
+    Raised when metadata doesn't fit a schema.
+
+    ``errors`` is a list of ``(key, message)`` tuples, one per bad key, and
+    ``filename`` is set when the post was loaded from a file.
+    """
+    def __init__(self, errors, filename=None):
+        super(SchemaError, self).__init__(errors, filename)
+        self.errors = errors
+        self.filename = filename
+
+    def __str__(self):
+        problems = '; '.join('{0}: {1}'.format(k, m) for k, m in self.errors)
+        if self.filename:
+            return '{0}: {1}'.format(self.filename, problems)
+        return problems
+
+
+def to_text(value):
+    "Coerce a scalar to text"
+    if value is None:
+        raise TypeError('expected text, got null')
+    if isinstance(value, (list, tuple, dict)):
+        raise TypeError('expected text, got {0}'.format(type(value).__name__))
+    return '{0}'.format(value)
+
+
+def to_int(value):
+    "Coerce to int, refusing booleans and lossy floats"
+    if isinstance(value, bool):
+        raise TypeError('expected an integer, got a boolean')
+    if isinstance(value, float) and not value.is_integer():
+        raise ValueError('expected an integer, got {0!r}'.format(value))
+    return int(value)
+
+
+def to_float(value):
+    "Coerce to float, refusing booleans"
+    if isinstance(value, bool):
+        raise TypeError('expected a number, got a boolean')
+    return float(value)
+
+
+def to_bool(value):
+    "Coerce to bool from booleans, 0/1 and yes/no style strings"
+    if isinstance(value, bool):
+        return value
+    text = '{0}'.format(value).strip().lower()
+    if text in TRUE:
+        return True
+    if text in FALSE:
+        return False
+    raise ValueError('expected a boolean, got {0!r}'.format(value))
+
+
+def to_datetime(value):
+    "Coerce to a datetime from a datetime, date or ISO-8601 string"
+    if isinstance(value, datetime.datetime):
+        return value
+    if isinstance(value, datetime.date):
+        return datetime.datetime(value.year, value.month, value.day)
+
+    text = to_text(value).strip()
+    for fmt in DATETIME_FORMATS:
+        try:
+            return datetime.datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+    raise ValueError('expected a date and time, got {0!r}'.format(value))
+
+
+def to_date(value):
+    "Coerce to a date from a date, datetime or ISO-8601 string"
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if isinstance(value, datetime.date):
+        return value
+    return to_datetime(value).date()
+
+
+COERCERS = {
+    str: to_text,
+    type(''): to_text,
+    int: to_int,
+    float: to_float,
+    bool: to_bool,
+    datetime.date: to_date,
+    datetime.datetime: to_datetime,
+}
+
+
+def list_of(coerce):
+    "Build a coercer for lists, wrapping single values in a list"
+    def coerce_list(value):
+        if not isinstance(value, (list, tuple)):
+            value = [value]
+        return [coerce(v) for v in value]
+    return coerce_list
+
+
+def compile_type(spec):
+    "Turn a type from a schema into a coercion function"
+    if isinstance(spec, (list, tuple)):
+        if len(spec) != 1:
+            raise TypeError('List types take exactly one item type: {0!r}'.format(spec))
+        return list_of(compile_type(spec[0]))
+
+    if spec in COERCERS:
+        return COERCERS[spec]
+
+    if callable(spec):
+        return spec
+
+    raise TypeError('Not a valid schema type: {0!r}'.format(spec))
+
+
+class Schema(object):
+    """
+    A compiled set of coercion functions for metadata.
+
+    ``fields`` maps keys to types (see above). Keys in ``required`` must be
+    present after defaults are applied. Keys not in ``fields`` are passed
+    through untouched.
+
+    Schemas are callable: ``schema(metadata)`` coerces ``metadata`` in place
+    and returns it, or raises :py:class:`SchemaError`.
+    """
+    def __init__(self, fields, required=()):
+        self.fields = dict(fields)
+        self.required = tuple(required)
+        self._coercers = tuple(
+            (key, compile_type(spec)) for key, spec in self.fields.items())
+
+    @classmethod
+    def compile(cls, schema):
+        "Return ``schema`` as a Schema, compiling a plain dict of fields"
+        if isinstance(schema, cls):
+            return schema
+        return cls(schema)
+
+    def __call__(self, metadata):
+        errors = [(key, 'required key is missing')
+                  for key in self.required if metadata.get(key) is None]
+
+        for key, coerce in self._coercers:
+            if metadata.get(key) is None:
+                continue
+            try:
+                metadata[key] = coerce(metadata[key])
+            except (TypeError, ValueError) as e:
+                errors.append((key, '{0}'.format(e)))
+
+        if errors:
+            raise SchemaError(errors)
+        return metadata
+
+    def __reduce__(self):
+        # coercers may be closures, so pickle the spec and compile again
+        return self.__class__, (self.fields, self.required)
@@ -0,0 +1,274 @@
+# -*- coding: utf-8 -*-
+"""
+A small full-text search index over posts, built while they're loaded.
+
+The index covers post content plus any metadata ``fields`` you choose,
+and remembers each file's size and modification time so that
+:py:meth:`Index.update` only reloads files that changed::
+
+    >>> from frontmatter.search import Index
+    >>> index = Index(fields=['title', 'tags'])
+    >>> post = index.load('tests/network-diagrams.markdown')
+    >>> post = index.load('tests/hello-world.markdown')
+    >>> index.search('hello world')
+    ['tests/hello-world.markdown']
+    >>> index.search('"network diagrams"', tags='todo')
+    ['tests/network-diagrams.markdown']
+
+Queries are made of words and "quoted phrases", all of which must match.
+Bare words search content; ``field:word`` searches an indexed metadata
+field. Keyword arguments to :py:meth:`Index.search` filter on indexed
+fields, matching a value or an item in a list.
+"""
+from __future__ import unicode_literals
+
+import gzip
+import json
+import os
+import re
+
+from . import load
+
+
+__all__ = ['Index']
+
+WORD = re.compile(r'\w+', re.UNICODE)
+QUERY = re.compile(r'"([^"]*)"|(\S+)', re.UNICODE)
+
+FORMAT_VERSION = 1
+
+
+def tokenize(text):
+    "Split text into lowercase words"
+    return WORD.findall(text.lower())
+
+
+def field_value(value):
+    "Turn a metadata value into text, or a list of text, for storing"
+    if isinstance(value, (list, tuple)):
+        return [field_value(v) for v in value]
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return '{0}'.format(value)
+
+
+def field_text(value):
+    "Flatten a stored value into text for indexing"
+    if isinstance(value, list):
+        return ' '.join(field_text(v) for v in value)
+    return value
+
+
+class Index(object):
+    """
+    An inverted index of post content and metadata ``fields``.
+
+    Postings map each term to the documents and word positions where it
+    appears, which is what makes phrase queries possible. Metadata terms
+    are stored as ``field:term``.
+    """
+    def __init__(self, fields=()):
+        self.fields = tuple(fields)
+        self.postings = {}  # term -> {doc id: [positions]}
+        self.docs = {}      # doc id -> [path, mtime, size, {field: value}]
+        self._ids = {}      # path -> doc id
+        self._terms = {}    # doc id -> set of terms, for removal
+        self._next_id = 0
+
+    def __len__(self):
+        return len(self.docs)
+
+    def __contains__(self, path):
+        return path in self._ids
+
+    def load(self, path, **kwargs):
+        """
+        Load the post at ``path`` with :py:func:`frontmatter.load <frontmatter.load>`,
+        index it and return it.
+        """
+        post = load(path, **kwargs)
+        self.add(path, post, os.stat(path))
+        return post
+
+    def add(self, path, post, stat=None):
+        """
+        Index a post that's already loaded, replacing anything indexed for
+        ``path``. Pass an ``os.stat`` result to let :py:meth:`update`
+        notice when the file changes.
+        """
+        self.remove(path)
+
+        doc = self._next_id
+        self._next_id += 1
+
+        stored = {}
+        terms = self._add_terms(doc, '', post.content)
+        for field in self.fields:
+            if field in post:
+                stored[field] = field_value(post[field])
+                terms.update(self._add_terms(doc, field + ':', field_text(stored[field])))
+
+        mtime, size = (stat.st_mtime, stat.st_size) if stat else (None, None)
+        self.docs[doc] = [path, mtime, size, stored]
+        self._ids[path] = doc
+        self._terms[doc] = terms
+
+    def remove(self, path):
+        "Drop ``path`` from the index, if it's there"
+        doc = self._ids.pop(path, None)
+        if doc is None:
+            return
+
+        del self.docs[doc]
+        for term in self._terms.pop(doc):
+            postings = self.postings[term]
+            del postings[doc]
+            if not postings:
+                del self.postings[term]
+
+    def update(self, paths, **kwargs):
+        """
+        Bring the index up to date with ``paths``, the full list of files
+        that should be indexed. New and changed files are loaded, and files
+        no longer in ``paths`` are removed. Returns the number of files
+        loaded.
+        """
+        loaded = 0
+        seen = set()
+        for path in paths:
+            seen.add(path)
+            stat = os.stat(path)
+            doc = self._ids.get(path)
+            if doc is not None:
+                _, mtime, size, _ = self.docs[doc]
+                if (mtime, size) == (stat.st_mtime, stat.st_size):
+                    continue
+
+            self.add(path, load(path, **kwargs), stat)
+            loaded += 1
+
+        for path in list(self._ids):
+            if path not in seen:
+                self.remove(path)
+
+        return loaded
+
+    def search(self, query, **filters):
+        """
+        Return paths of posts matching every word and phrase in ``query``
+        and every filter, best matches first.
+        """
+        phrases = []
+        for phrase, word in QUERY.findall(query):
+            prefix = ''
+            if word and ':' in word:
+                field, rest = word.split(':', 1)
+                if field in self.fields:
+                    prefix, word = field + ':', rest
+            terms = [prefix + t for t in tokenize(phrase or word)]
+            if terms:
+                phrases.append(terms)
+
+        candidates = None
+        for terms in phrases:
+            for term in terms:
+                docs = set(self.postings.get(term, ()))
+                candidates = docs if candidates is None else candidates & docs
+
+        if candidates is None:
+            candidates = set(self.docs)
+
+        scores = []
+        for doc in candidates:
+            if not self._filter(doc, filters):
+                continue
+            score = 0
+            for terms in phrases:
+                found = self._phrase(doc, terms)
+                if not found:
+                    break
+                score += found
+            else:
+                scores.append((-score, self.docs[doc][0]))
+
+        return [path for score, path in sorted(scores)]
+
+    def save(self, filename):
+        "Write the index to ``filename`` as gzipped JSON"
+        postings = {}
+        for term, docs in self.postings.items():
+            postings[term] = dict(('{0}'.format(doc), _deltas(positions))
+                                  for doc, positions in docs.items())
+
+        data = {
+            'version': FORMAT_VERSION,
+            'fields': self.fields,
+            'docs': dict(('{0}'.format(doc), d) for doc, d in self.docs.items()),
+            'postings': postings,
+        }
+        with gzip.open(filename, 'wb') as f:
+            f.write(json.dumps(data, separators=(',', ':')).encode('utf-8'))
+
+    @classmethod
+    def open(cls, filename):
+        "Read an index written by :py:meth:`save`"
+        with gzip.open(filename, 'rb') as f:
+            data = json.loads(f.read().decode('utf-8'))
+
+        if data['version'] != FORMAT_VERSION:
+            raise ValueError('Unsupported index version: {0}'.format(data['version']))
+
+        index = cls(data['fields'])
+        for doc, d in data['docs'].items():
+            doc = int(doc)
+            index.docs[doc] = d
+            index._ids[d[0]] = doc
+            index._terms[doc] = set()
+            index._next_id = max(index._next_id, doc + 1)
+
+        for term, docs in data['postings'].items():
+            postings = index.postings[term] = {}
+            for doc, deltas in docs.items():
+                doc = int(doc)
+                postings[doc] = _positions(deltas)
+                index._terms[doc].add(term)
+
+        return index
+
+    def _add_terms(self, doc, prefix, text):
+        terms = set()
+        for position, word in enumerate(tokenize(text)):
+            term = prefix + word
+            self.postings.setdefault(term, {}).setdefault(doc, []).append(position)
+            terms.add(term)
+        return terms
+
+    def _filter(self, doc, filters):
+        stored = self.docs[doc][3]
+        for field, value in filters.items():
+            found = stored.get(field)
+            value = field_value(value)
+            if found != value and not (isinstance(found, list) and value in found):
+                return False
+        return True
+
+    def _phrase(self, doc, terms):
+        "Count where ``terms`` appear next to each other in ``doc``"
+        positions = [set(self.postings.get(term, {}).get(doc, ())) for term in terms]
+        if not positions:
+            return 0
+        return sum(1 for start in positions[0]
+                   if all(start + i in p for i, p in enumerate(positions[1:], 1)))
+
+
+def _deltas(positions):
+    "Delta-encode sorted positions, which keeps saved indexes small"
+    return [b - a for a, b in zip([0] + positions, positions)]
+
+
+def _positions(deltas):
+    positions, total = [], 0
+    for delta in deltas:
+        total += delta
+        positions.append(total)
+    return positions
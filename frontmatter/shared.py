@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+"""
+A read-only corpus in shared memory, so pre-forked worker processes can
+all read one copy of it instead of each loading their own.
+
+One process loads the corpus into a block of shared memory, in the same
+format as a :py:class:`bundle <frontmatter.bundle.Bundle>`; workers attach
+to it by name. Looking up a post gives a :py:class:`PostView`, which reads
+metadata and content out of shared memory when they're used rather than
+keeping copies of the whole corpus in the worker::
+
+    >>> from frontmatter.shared import SharedCorpus
+    >>> corpus = SharedCorpus.create(['tests/hello-world.markdown'], root='tests')
+    >>> worker = SharedCorpus.attach(corpus.name)  # usually in another process
+    >>> post = worker['hello-world.markdown']
+    >>> post['title'], post.content
+    ('Hello, world!', 'Well, hello there, world.')
+    >>> worker.close()
+    >>> corpus.close()
+    >>> corpus.unlink()
+
+Requires Python 3.8 or later, for ``multiprocessing.shared_memory``.
+"""
+from __future__ import unicode_literals
+
+import io
+
+from . import Post
+from .bundle import Bundle, pack
+from .codec import decode, handler_from_name, rebuild
+
+
+__all__ = ['SharedCorpus', 'PostView']
+
+
+class SharedCorpus(Bundle):
+    """
+    Posts packed into a ``multiprocessing.shared_memory`` block. Use
+    :py:meth:`create` to build one and :py:meth:`attach` to open it from
+    another process; ``name`` identifies the block.
+
+    Lookups return :py:class:`PostView` objects; :py:meth:`post` returns
+    an independent :py:class:`Post <frontmatter.Post>` instead.
+    """
+    def __init__(self, memory, owner=False, cls=Post):
+        self.memory = memory
+        self.name = self.filename = memory.name
+        self.owner = owner
+        self.cls = cls
+        self._handlers = {}
+        self._buffer = memory.buf.toreadonly()
+        try:
+            self._read_index()
+        except Exception:
+            self.close()
+            raise
+
+    @classmethod
+    def create(cls, paths, name=None, **kwargs):
+        """
+        Load ``paths`` into a new shared memory block, named ``name`` or
+        given a random name. Keyword arguments are passed to
+        :py:func:`frontmatter.pack <frontmatter.pack>`.
+
+        The creating process owns the block and should call
+        :py:meth:`unlink` once every worker is done with it.
+        """
+        from multiprocessing.shared_memory import SharedMemory
+
+        out = io.BytesIO()
+        pack(paths, out, **kwargs)
+        data = out.getbuffer()
+
+        memory = SharedMemory(name, create=True, size=len(data))
+        try:
+            memory.buf[:len(data)] = data
+        except Exception:
+            memory.close()
+            memory.unlink()
+            raise
+        finally:
+            data.release()
+
+        return cls(memory, owner=True)
+
+    @classmethod
+    def attach(cls, name):
+        "Open a corpus made by :py:meth:`create`, read-only"
+        from multiprocessing.shared_memory import SharedMemory
+        try:
+            memory = SharedMemory(name, track=False)
+        except TypeError:
+            # before python 3.13, attaching registers the block with the
+            # resource tracker, which would destroy it when this process
+            # exits; only the creator should do that
+            memory = SharedMemory(name)
+            _track(memory, False)
+        return cls(memory)
+
+    def __getitem__(self, name):
+        "Get a view of the post called ``name``"
+        if name not in self._positions:
+            raise KeyError(name)
+        return PostView(self, name)
+
+    def post(self, name):
+        "Load the post called ``name`` as an independent post"
+        return Bundle.__getitem__(self, name)
+
+    def close(self):
+        "Detach from the shared memory block"
+        if self._buffer is not None:
+            self._buffer.release()
+            self._buffer = None
+            self.memory.close()
+
+    def unlink(self):
+        "Free the shared memory block, once every process has closed it"
+        # workers attaching before python 3.13 may have taken the block off
+        # the resource tracker, which unlink expects to find it in
+        _track(self.memory, True)
+        self.memory.unlink()
+
+    def _record(self, name):
+        meta_offset, meta_size, body_offset, body_size = self._entry(name)
+        return decode(self._buffer[meta_offset:meta_offset + meta_size])
+
+    def _content(self, name):
+        meta_offset, meta_size, body_offset, body_size = self._entry(name)
+        return bytes(self._buffer[body_offset:body_offset + body_size]).decode('utf-8')
+
+    def _handler(self, name):
+        "One shared handler instance per handler name"
+        if name not in self._handlers:
+            self._handlers[name] = handler_from_name(name)
+        return self._handlers[name]
+
+
+def _track(memory, track):
+    "Add a block to the resource tracker, or take it off"
+    try:
+        from multiprocessing import resource_tracker
+        if track:
+            resource_tracker.register(memory._name, 'shared_memory')
+        else:
+            resource_tracker.unregister(memory._name, 'shared_memory')
+    except Exception:  # platforms without a resource tracker
+        pass
+
+
+class PostView(object):
+    """
+    A read-only, :py:class:`Post <frontmatter.Post>`-like view of a post in
+    a :py:class:`SharedCorpus`. Metadata is decoded from shared memory the
+    first time it's used and kept by the view, so don't change it; content
+    is decoded each time it's read. Call :py:meth:`to_post` for a post of
+    your own.
+    """
+    def __init__(self, corpus, name):
+        self.corpus = corpus
+        self.name = name
+        self._record = None
+
+    def __repr__(self):
+        return '<PostView {0!r}>'.format(self.name)
+
+    @property
+    def metadata(self):
+        if self._record is None:
+            self._record = self.corpus._record(self.name)
+        return self._record[1]
+
+    @property
+    def content(self):
+        return self.corpus._content(self.name)
+
+    @property
+    def handler(self):
+        if self._record is None:
+            self._record = self.corpus._record(self.name)
+        return self.corpus._handler(self._record[0])
+
+    def __getitem__(self, key):
+        return self.metadata[key]
+
+    def __contains__(self, key):
+        return key in self.metadata
+
+    def __str__(self):
+        return self.content
+
+    def get(self, key, default=None):
+        return self.metadata.get(key, default)
+
+    def keys(self):
+        return self.metadata.keys()
+
+    def values(self):
+        return self.metadata.values()
+
+    def to_dict(self):
+        d = dict(self.metadata)
+        d['content'] = self.content
+        return d
+
+    def to_post(self):
+        "Copy this post out of shared memory as a :py:class:`Post <frontmatter.Post>`"
+        handler, metadata, fm, offset = self.corpus._record(self.name)
+        return rebuild(self.corpus.cls, handler, metadata, self.content, fm, offset)
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""
+Snapshots record what the metadata in a content tree looks like, so two
+versions of the tree can be compared without loading either one in full.
+
+For each file, a snapshot keeps a hash of the raw frontmatter text and a
+fingerprint of each metadata value. Building a snapshot only reads file
+headers, and given the previous snapshot, only re-parses headers whose
+text changed::
+
+    >>> from frontmatter.snapshot import Snapshot
+    >>> old = Snapshot.build('tests')
+    >>> new = Snapshot.build('tests', previous=old)
+    >>> old.diff(new)
+    Diff(added=[], removed=[], changed={})
+
+"""
+from __future__ import unicode_literals
+
+import collections
+import hashlib
+import io
+import json
+import os
+
+from . import EXTENSIONS, loads, read_header
+
+
+__all__ = ['Snapshot', 'Diff']
+
+FORMAT_VERSION = 1
+
+Diff = collections.namedtuple('Diff', ['added', 'removed', 'changed'])
+Diff.__doc__ = """
+The difference between two snapshots. ``added`` and ``removed`` are sorted
+lists of paths, and ``changed`` maps each changed path to a sorted list of
+metadata keys that were added, removed or given new values.
+"""
+
+
+def digest(text):
+    "Hash text, returning a hex string"
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def fingerprint(value):
+    "Hash a metadata value in a way that doesn't depend on dict order"
+    return digest(json.dumps(value, sort_keys=True, default=_json_default))
+
+
+def _json_default(value):
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return repr(value)
+
+
+class Snapshot(object):
+    """
+    Header hashes and metadata fingerprints for a set of files.
+
+    ``entries`` maps paths, relative to the tree's root, to a
+    ``(header hash, {key: fingerprint})`` pair. Files that can't be decoded
+    as text aren't posts, and get a header hash of ``None``.
+    """
+    def __init__(self, entries=None):
+        self.entries = entries or {}
+
+    def __len__(self):
+        return len(self.entries)
+
+    @classmethod
+    def build(cls, root, paths=None, previous=None, encoding='utf-8', extensions=EXTENSIONS):
+        """
+        Snapshot the files under ``root``: every file in the tree with one
+        of ``extensions`` (those the command line tool reads, by default),
+        or just ``paths`` (relative to ``root``) if given.
+
+        Pass the ``previous`` snapshot to skip parsing any file whose
+        frontmatter text hasn't changed since then.
+        """
+        if paths is None:
+            paths = _walk(root, tuple(extensions))
+
+        old = previous.entries if previous is not None else {}
+        entries = {}
+        for path in paths:
+            try:
+                with io.open(os.path.join(root, path), 'r', encoding=encoding) as f:
+                    header = read_header(f, encoding)
+            except UnicodeDecodeError:
+                entries[path] = (None, {})
+                continue
+
+            header_hash = digest(header)
+            if path in old and old[path][0] == header_hash:
+                entries[path] = old[path]
+                continue
+
+            metadata = loads(header, encoding).metadata
+            entries[path] = (header_hash, dict(
+                (key, fingerprint(value)) for key, value in metadata.items()))
+
+        return cls(entries)
+
+    def diff(self, other):
+        """
+        Compare this snapshot with a newer one, returning a :py:class:`Diff`.
+        """
+        added = sorted(set(other.entries) - set(self.entries))
+        removed = sorted(set(self.entries) - set(other.entries))
+
+        changed = {}
+        for path in set(self.entries) & set(other.entries):
+            old_hash, old_keys = self.entries[path]
+            new_hash, new_keys = other.entries[path]
+            if old_hash == new_hash:
+                continue
+
+            keys = sorted(key for key in set(old_keys) | set(new_keys)
+                          if old_keys.get(key) != new_keys.get(key))
+            if keys:
+                changed[path] = keys
+
+        return Diff(added, removed, changed)
+
+    def save(self, filename):
+        "Write the snapshot to ``filename`` as JSON"
+        with io.open(filename, 'w', encoding='utf-8') as f:
+            f.write('{0}'.format(json.dumps(
+                {'version': FORMAT_VERSION, 'entries': self.entries},
+                sort_keys=True, separators=(',', ':'))))
+
+    @classmethod
+    def open(cls, filename):
+        "Read a snapshot written by :py:meth:`save`"
+        with io.open(filename, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+
+        if data['version'] != FORMAT_VERSION:
+            raise ValueError('Unsupported snapshot version: {0}'.format(data['version']))
+
+        return cls(dict((path, tuple(entry)) for path, entry in data['entries'].items()))
+
+
+def _walk(root, extensions):
+    "Yield every file under ``root`` with one of ``extensions``, relative to it"
+    for dirpath, dirs, files in os.walk(root):
+        for name in files:
+            if name.lower().endswith(extensions):
+                yield os.path.relpath(os.path.join(dirpath, name), root)
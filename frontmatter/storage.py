@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+"""
+Storage backends tell :py:func:`load_many <frontmatter.load_many>` where
+bytes come from. Local files are supported out of the box; anything that
+can read a byte range -- an object store, a cache, a database -- can be
+plugged in by subclassing :py:class:`Storage` and implementing
+:py:meth:`Storage.read`.
+
+Storage adds two things on top of plain reads:
+
+- prefetching, where a pool of threads reads files ahead of the parser
+- ranged header reads, where only the first few kilobytes of each file
+  are fetched when just the frontmatter is needed
+
+::
+
+    >>> from frontmatter.storage import LocalStorage
+    >>> with LocalStorage('tests') as storage:
+    ...     posts = frontmatter.load_many(['hello-world.markdown'], storage=storage)
+    ...     print(next(posts)['title'])
+    Hello, world!
+
+"""
+from __future__ import unicode_literals
+
+import codecs
+import collections
+import io
+import os
+import threading
+
+from . import read_header
+
+
+__all__ = ['Storage', 'LocalStorage']
+
+HEAD_SIZE = 4096
+
+
+class Storage(object):
+    """
+    Base class for storage backends.
+
+    ``workers`` is the number of threads used to prefetch files, and
+    ``ahead`` is how many files may be fetched before they're used.
+    """
+    def __init__(self, workers=8, ahead=64):
+        self.workers = workers
+        self.ahead = ahead
+        self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def read(self, path, start=0, size=None):
+        """
+        Return up to ``size`` bytes of ``path``, starting at byte ``start``.
+        With no ``size``, read to the end. Subclasses must implement this.
+        """
+        raise NotImplementedError
+
+    def read_header(self, path, encoding='utf-8', handler=None, head_size=HEAD_SIZE):
+        """
+        Fetch just the frontmatter of ``path``, as text. This reads
+        ``head_size`` bytes, then reads further in growing chunks only if
+        the closing delimiter hasn't turned up yet.
+        """
+        decoder = codecs.getincrementaldecoder(encoding)()
+        text = ''
+        start, size = 0, head_size
+        while True:
+            data = self.read(path, start, size)
+            eof = len(data) < size
+            text += decoder.decode(data, final=eof)
+
+            buf = io.StringIO(text)
+            header = read_header(buf, encoding, handler)
+            if eof or buf.tell() < len(text):
+                return header
+
+            start += len(data)
+            size *= 2
+
+    def fetch(self, paths, header_only=False, encoding='utf-8', handler=None):
+        """
+        Yield ``(path, data)`` for each of ``paths`` in order, reading
+        ahead in background threads. ``data`` is the whole file as bytes,
+        or the frontmatter as text with ``header_only``.
+        """
+        if header_only:
+            def get(path):
+                return self.read_header(path, encoding, handler)
+        else:
+            get = self.read
+
+        pool = self._threads()
+        pending = collections.deque()
+        for path in paths:
+            pending.append((path, pool.apply_async(get, (path,))))
+            if len(pending) >= self.ahead:
+                path, result = pending.popleft()
+                yield path, result.get()
+
+        while pending:
+            path, result = pending.popleft()
+            yield path, result.get()
+
+    def close(self):
+        "Release threads and anything else the backend holds open"
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+    def _threads(self):
+        if self._pool is None:
+            from multiprocessing.pool import ThreadPool
+            self._pool = ThreadPool(self.workers)
+        return self._pool
+
+
+class LocalStorage(Storage):
+    """
+    Files on the local filesystem, optionally relative to ``root``.
+
+    Up to ``max_handles`` files are kept open and reused, so a header read
+    followed by a body read only opens the file once. Reads use
+    ``os.pread`` where available, so threads can share handles safely.
+    """
+    def __init__(self, root=None, max_handles=128, **kwargs):
+        super(LocalStorage, self).__init__(**kwargs)
+        self.root = root
+        self.max_handles = max_handles
+        self._handles = collections.OrderedDict()  # path -> fd, oldest first
+        self._busy = {}  # fd -> number of reads using it
+        self._evicted = set()
+        self._lock = threading.Lock()
+
+    def read(self, path, start=0, size=None):
+        fd = self._acquire(path)
+        try:
+            if size is None:
+                size = os.fstat(fd).st_size - start
+
+            if not hasattr(os, 'pread'):
+                with self._lock:
+                    os.lseek(fd, start, os.SEEK_SET)
+                    return os.read(fd, size)
+
+            chunks = []
+            while size > 0:
+                chunk = os.pread(fd, size, start)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+                start += len(chunk)
+                size -= len(chunk)
+            return b''.join(chunks)
+
+        finally:
+            self._release(fd)
+
+    def close(self):
+        with self._lock:
+            for fd in self._handles.values():
+                os.close(fd)
+            self._handles.clear()
+        super(LocalStorage, self).close()
+
+    def _acquire(self, path):
+        "Get an open handle for ``path``, marking it in use"
+        if self.root is not None:
+            path = os.path.join(self.root, path)
+
+        with self._lock:
+            fd = self._handles.pop(path, None)
+            if fd is None:
+                fd = os.open(path, os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+                self._evict()
+            self._handles[path] = fd
+            self._busy[fd] = self._busy.get(fd, 0) + 1
+            return fd
+
+    def _release(self, fd):
+        with self._lock:
+            self._busy[fd] -= 1
+            if self._busy[fd]:
+                return
+            del self._busy[fd]
+            if fd in self._evicted:
+                self._evicted.discard(fd)
+                os.close(fd)
+
+    def _evict(self):
+        "Close the least recently used idle handles, down to the limit"
+        for path in list(self._handles):
+            if len(self._handles) < self.max_handles:
+                break
+            fd = self._handles.pop(path)
+            if fd in self._busy:
+                self._evicted.add(fd)  # closed once the last read is done
+            else:
+                os.close(fd)
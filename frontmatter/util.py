@@ -2,12 +2,11 @@
 """
 Utilities for handling unicode and other repetitive bits
 """
-import six
 
 def u(text, encoding='utf-8'):
     "Return unicode text, no matter what"
 
-    if isinstance(text, six.binary_type):
+    if isinstance(text, bytes):
         text = text.decode(encoding)
 
     # it's already unicode
@@ -13,7 +13,6 @@ with open('README.md') as f:
 
 requirements = [
     'PyYAML',
-    'six'
 ]
 
 
@@ -31,6 +30,9 @@ setup(
     packages = ['frontmatter'],
     include_package_data = True,
     install_requires = requirements,
+    entry_points = {
+        'console_scripts': ['frontmatter = frontmatter.cli:main'],
+    },
     license = 'MIT',
     zip_safe = False,
     keywords = 'frontmatter',
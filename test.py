@@ -5,20 +5,38 @@ from __future__ import unicode_literals
 from __future__ import print_function
 
 import codecs
+import copy
+import datetime
 import doctest
 import glob
 import json
 import os
+import pickle
+import re
 import shutil
+import subprocess
 import sys
+import tarfile
 import tempfile
 import textwrap
 import unittest
+import zipfile
 
 import six
 
 import frontmatter
+import frontmatter.columns
+import frontmatter.facets
+from frontmatter.bundle import Bundle
+from frontmatter.codec import encode, decode, handler_from_name, register_handler
 from frontmatter.default_handlers import YAMLHandler, JSONHandler, TOMLHandler 
+from frontmatter.limits import Limits, LimitError
+from frontmatter.listing import Listing
+from frontmatter.schema import Schema, SchemaError
+from frontmatter.search import Index
+from frontmatter.shared import SharedCorpus
+from frontmatter.snapshot import Snapshot
+from frontmatter.storage import Storage, LocalStorage
 
 try:
     import pyaml
@@ -145,6 +163,115 @@ class FrontmatterTest(unittest.TestCase):
         # cleanup
         shutil.rmtree(tempdir)
 
+    def test_header_only(self):
+        "header_only reads metadata and stops before the body"
+        for filename in glob.glob('tests/*'):
+            post = frontmatter.load(filename)
+            header = frontmatter.load(filename, header_only=True)
+            self.assertEqual(header.metadata, post.metadata)
+            self.assertEqual(header.content, '')
+
+        with codecs.open('tests/hello-markdown.markdown', 'r', 'utf-8') as f:
+            frontmatter.read_header(f)
+            self.assertTrue(f.read().strip().startswith('Title'))
+
+    def test_excerpt(self):
+        "excerpts stop at the marker or length, reading only as far as needed"
+        body = 'Intro text.\n<!--more-->\n' + 'The rest. ' * 10000
+        f = six.BytesIO(('---\ntitle: Long\n---\n' + body).encode('utf-8'))
+        post = frontmatter.load(f, excerpt=True)
+        self.assertEqual(post['title'], 'Long')
+        self.assertEqual(post.excerpt(), 'Intro text.')
+        self.assertEqual(post.content, '')
+        self.assertTrue(f.tell() < len(body) // 10)
+        self.assertEqual(post.excerpt(), 'Intro text.')
+        self.assertRaises(ValueError, post.excerpt, 100)
+
+        full = frontmatter.loads('---\ntitle: Long\n---\n' + body)
+        self.assertEqual(full.excerpt(5), 'Intro')
+        self.assertEqual(full.excerpt(marker='rest'), 'Intro text.\n<!--more-->\nThe')
+
+        for filename in glob.glob('tests/*'):
+            post = frontmatter.load(filename)
+            header = frontmatter.load(filename, header_only=True)
+            for length in (None, 8, 200):
+                self.assertEqual(header.excerpt(length), post.excerpt(length))
+                prefix = frontmatter.load(filename, excerpt=length or True)
+                self.assertEqual(prefix.metadata, post.metadata)
+                self.assertEqual(prefix.excerpt(length), post.excerpt(length))
+
+        post = frontmatter.load('tests/hello-world.markdown', excerpt=False)
+        self.assertEqual(post.content, 'Well, hello there, world.')
+
+    def test_excerpt_chunks(self):
+        "headers and markers that span chunks are found"
+        header = '---\n' + ''.join('key{0}: {0}\n'.format(i) for i in range(1000)) + '---\n'
+        padding = 'x' * (frontmatter.EXCERPT_CHUNK - len(header) % frontmatter.EXCERPT_CHUNK - 4)
+        text = header + '\n\n' + padding + '<!--more-->' + 'y' * 20000
+        f = six.BytesIO(text.encode('utf-8'))
+        post = frontmatter.load(f, excerpt=True)
+        self.assertEqual(post['key999'], 999)
+        self.assertEqual(post.excerpt(), padding)
+        self.assertTrue(f.tell() < len(text) - 10000)
+
+        f = six.BytesIO(('{\n"title": "JSON"\n}\n' + text[len(header):]).encode('utf-8'))
+        post = frontmatter.load(f, excerpt=len(padding) + 5)
+        self.assertEqual(post['title'], 'JSON')
+        self.assertEqual(post.excerpt(len(padding) + 5), padding)
+
+    def test_dump_unchanged_reuses_frontmatter(self):
+        "An untouched post writes its original frontmatter back"
+        with codecs.open('tests/unpretty.md', 'r', 'utf-8') as f:
+            data = f.read()
+
+        post = frontmatter.load('tests/unpretty.md')
+        self.assertEqual(frontmatter.dumps(post), data.strip())
+
+    def test_dump_changed_exports_metadata(self):
+        "Changed metadata is exported, including nested in-place changes"
+        post = frontmatter.load('tests/unpretty.md')
+        post['url'] = 'http://example.com'
+        self.assertTrue('url: http://example.com' in frontmatter.dumps(post))
+
+        post = frontmatter.load('tests/unpretty.md')
+        post['filter'].append('third')
+        self.assertTrue('- third' in frontmatter.dumps(post))
+
+        post = frontmatter.load('tests/unpretty.md')
+        post.metadata = dict(post.metadata, url='http://example.com')
+        self.assertTrue('url: http://example.com' in frontmatter.dumps(post))
+
+    def test_dump_extra_metadata(self):
+        "Defaults, schemas and selected keys are exported, not the raw frontmatter"
+        post = frontmatter.loads('---\ntitle: a\n---\nbody', layout='post')
+        self.assertTrue('layout: post' in frontmatter.dumps(post))
+
+        post = frontmatter.loads('---\ncount: "3"\n---\n', schema={'count': int})
+        self.assertTrue('count: 3' in frontmatter.dumps(post))
+
+        post = frontmatter.load('tests/unpretty.md', keys=['title'])
+        self.assertEqual(frontmatter.loads(frontmatter.dumps(post)).metadata, post.metadata)
+
+    def test_dump_unchanged_skips_parsing(self):
+        "Checking an untouched post for changes doesn't parse it again"
+        class CountingHandler(YAMLHandler):
+            loads = 0
+
+            def load(self, fm, **kwargs):
+                CountingHandler.loads += 1
+                return super(CountingHandler, self).load(fm, **kwargs)
+
+        with codecs.open('tests/unpretty.md', 'r', 'utf-8') as f:
+            data = f.read()
+
+        post = frontmatter.load('tests/unpretty.md', handler=CountingHandler())
+        loads = CountingHandler.loads
+        self.assertEqual(frontmatter.dumps(post), data.strip())
+        self.assertEqual(CountingHandler.loads, loads)
+
+        post = pickle.loads(pickle.dumps(frontmatter.load('tests/unpretty.md')))
+        self.assertEqual(frontmatter.dumps(post), data.strip())
+
 
 class HandlerTest(unittest.TestCase):
     """
@@ -235,12 +362,936 @@ class HandlerTest(unittest.TestCase):
         for k, v in metadata.items():
             self.assertEqual(post[k], v)
 
+    def test_json_nested(self):
+        "JSON frontmatter ends at its closing brace, not the first } line"
+        text = '{\n"a": {\n"b": "} {"\n},\n"c": "\\"}"\n}\nBody\n}\n'
+        post = frontmatter.loads(text)
+        self.assertEqual(post.metadata, {'a': {'b': '} {'}, 'c': '"}'})
+        self.assertEqual(post.content, 'Body\n}')
+        self.assertEqual(text[post._offset:], 'Body\n}\n')
+
+        header = frontmatter.read_header(six.StringIO(text))
+        self.assertEqual(header, text[:text.index('Body')])
+        self.assertRaises(ValueError, JSONHandler().split, '{\n"a": 1\n')
+
+    def test_timestamps(self):
+        "timestamps can be read faster, or kept as strings that round trip"
+        fm = 'date: 2020-01-02\nupdated: 2020-01-02 03:04:05.5\ntz: 2001-12-14 21:59:43.10 -5\n'
+        default = YAMLHandler().load(fm)
+        self.assertEqual(YAMLHandler(timestamps='fast').load(fm), default)
+        self.assertEqual(YAMLHandler(timestamps='fast').load_keys(fm, ['date']),
+                         {'date': datetime.date(2020, 1, 2)})
+
+        handler = YAMLHandler(timestamps='string')
+        metadata = handler.load(fm)
+        self.assertEqual(metadata['date'], '2020-01-02')
+        self.assertEqual(handler.load_keys(fm, ['tz']), {'tz': '2001-12-14 21:59:43.10 -5'})
+
+        post = frontmatter.loads('---\n' + fm + '---\nBody', handler=handler)
+        post['title'] = 'Changed'
+        self.assertEqual(frontmatter.loads(frontmatter.dumps(post), handler=handler).metadata,
+                         post.metadata)
+        self.assertTrue('date: 2020-01-02\n' in frontmatter.dumps(post))
+
+        self.assertRaises(ValueError, YAMLHandler, timestamps='nope')
+
+    def test_load_keys(self):
+        "load only some keys, with every handler"
+        for filename in self.TEST_FILES:
+            post = frontmatter.load(filename)
+            keys = ['author', 'title', 'missing']
+            selected = frontmatter.load(filename, keys=keys)
+
+            expected = dict((k, post[k]) for k in keys if k in post)
+            self.assertEqual(selected.metadata, expected)
+            self.assertEqual(selected.content, post.content)
+
+    def test_yaml_load_keys_skips_values(self):
+        "YAML key selection skips other values but keeps their anchors"
+        fm = textwrap.dedent("""\
+        table: &rows
+          - {a: 1, b: [1, 2, 3]}
+          - {a: 2, b: [4, 5, 6]}
+        other: [x, [y, z]]
+        rows: *rows
+        title: Hi
+        """)
+        handler = YAMLHandler()
+        self.assertEqual(handler.load_keys(fm, ['title', 'rows']), {
+            'title': 'Hi',
+            'rows': [{'a': 1, 'b': [1, 2, 3]}, {'a': 2, 'b': [4, 5, 6]}],
+        })
+
+        # merge keys fall back to a full load
+        fm = "base: &b {k: 1}\n<<: *b\n"
+        self.assertEqual(handler.load_keys(fm, ['k']), {'k': 1})
 
     def test_json_output(self):
         "load, export, and reload"
 
 
+class ThreadTest(unittest.TestCase):
+    """
+    Tests for parsing from many threads at once
+    """
+    def test_concurrent_parsing(self):
+        "threads sharing handlers get the same posts as one thread"
+        from multiprocessing.pool import ThreadPool
+
+        texts = []
+        for filename in sorted(glob.glob('tests/*')):
+            with codecs.open(filename, 'r', 'utf-8') as f:
+                texts.append(f.read())
+        expected = [frontmatter.loads(text).metadata for text in texts]
+
+        class OtherHandler(YAMLHandler):
+            FM_BOUNDARY = re.compile(r'^~{3,}$', re.MULTILINE)
+
+        def work(i):
+            # register and drop a handler while other threads detect formats
+            other = OtherHandler()
+            frontmatter.handlers[other.FM_BOUNDARY] = other
+            frontmatter.handlers.pop(other.FM_BOUNDARY, None)
+            keys = ['title', 'author'] if i % 2 else None
+            return [frontmatter.loads(text, keys=keys).metadata for text in texts]
+
+        pool = ThreadPool(8)
+        try:
+            results = pool.map(work, range(64))
+        finally:
+            pool.close()
+            pool.join()
+
+        for i, result in enumerate(results):
+            for full, metadata in zip(expected, result):
+                if i % 2:
+                    full = dict((k, v) for k, v in full.items() if k in ('title', 'author'))
+                self.assertEqual(metadata, full)
+
+    def test_settings_are_fixed(self):
+        "handler settings can't change after the handler is made"
+        handler = JSONHandler(start_delimiter='<')
+        self.assertEqual(handler.START_DELIMITER, '<')
+        for name in ('FM_BOUNDARY', 'START_DELIMITER', 'END_DELIMITER'):
+            self.assertRaises(AttributeError, setattr, handler, name, None)
+
+
+class SchemaTest(unittest.TestCase):
+    """
+    Tests for coercing and validating metadata while loading
+    """
+    TEXT = textwrap.dedent("""\
+    ---
+    title: Hello
+    date: 2017-03-04 10:30:00
+    count: "3"
+    draft: "no"
+    tags: python
+    ---
+    content
+    """)
+
+    def test_coercion(self):
+        "schema types are applied during loading"
+        schema = Schema({
+            'date': datetime.date,
+            'count': int,
+            'draft': bool,
+            'tags': [str],
+        })
+        post = frontmatter.loads(self.TEXT, schema=schema)
+
+        self.assertEqual(post['date'], datetime.date(2017, 3, 4))
+        self.assertEqual(post['count'], 3)
+        self.assertEqual(post['draft'], False)
+        self.assertEqual(post['tags'], ['python'])
+        self.assertEqual(post['title'], 'Hello')
+
+    def test_all_errors_reported(self):
+        "every bad key in a file is reported at once"
+        schema = Schema({'title': int, 'draft': float}, required=['author'])
+        with self.assertRaises(SchemaError) as cm:
+            frontmatter.loads(self.TEXT, schema=schema)
+
+        keys = sorted(key for key, message in cm.exception.errors)
+        self.assertEqual(keys, ['author', 'draft', 'title'])
+
+    def test_error_names_file(self):
+        "loading from a file puts the filename on the error"
+        with self.assertRaises(SchemaError) as cm:
+            frontmatter.load('tests/hello-world.markdown', schema={'title': int})
+
+        self.assertEqual(cm.exception.filename, 'tests/hello-world.markdown')
+
+    def test_nulls(self):
+        "null values stay null, count as missing and can't be list items"
+        text = '---\ntitle:\ndate:\ntags:\n---\n'
+        post = frontmatter.loads(text, schema={'title': str, 'date': datetime.date, 'tags': [str]})
+        self.assertEqual(post.metadata, {'title': None, 'date': None, 'tags': None})
+
+        with self.assertRaises(SchemaError) as cm:
+            frontmatter.loads(text, schema=Schema({'title': str}, required=['title']))
+        self.assertEqual(cm.exception.errors, [('title', 'required key is missing')])
+
+        with self.assertRaises(SchemaError) as cm:
+            frontmatter.loads('---\ntags: [a, ~]\n---\n', schema={'tags': [str]})
+        self.assertEqual(cm.exception.errors, [('tags', 'expected text, got null')])
+
+
+class LimitTest(unittest.TestCase):
+    """
+    Tests for resource limits on frontmatter
+    """
+    def bomb(self, levels=8):
+        lines = ['a0: &a0 [lol, lol, lol, lol, lol, lol, lol, lol, lol]']
+        for i in range(1, levels + 1):
+            lines.append('a{0}: &a{0} [{1}]'.format(i, ', '.join(['*a{0}'.format(i - 1)] * 9)))
+        return '---\n' + '\n'.join(lines) + '\n---\nBody'
+
+    def assertLimit(self, limit, text, **kwargs):
+        with self.assertRaises(LimitError) as context:
+            frontmatter.loads(text, limits=Limits(**kwargs))
+        self.assertEqual(context.exception.limit, limit)
+
+    def test_aliases(self):
+        "alias bombs fail before they're expanded"
+        self.assertLimit('aliases', self.bomb(), aliases=10000)
+        self.assertEqual(len(frontmatter.loads(self.bomb(1), limits={'aliases': 100})['a1']), 9)
+
+    def test_depth(self):
+        "nesting is limited for YAML and JSON"
+        for text in ('---\na:\n  b: [1]\n---\n', '{\n"a": {"b": [1, "]]]"]}\n}\n'):
+            self.assertLimit('depth', text, depth=2)
+            self.assertEqual(frontmatter.loads(text, limits={'depth': 3})['a']['b'][0], 1)
+
+        self.assertLimit('depth', '---\na: ' + '[' * 1000 + ']' * 1000 + '\n---\n', depth=50)
+
+    def test_size_and_time(self):
+        "huge headers and slow parses fail"
+        self.assertLimit('header_size', '---\ntitle: 中文中文\n---\n', header_size=20)
+        frontmatter.loads('---\ntitle: 中文中文\n---\n', limits={'header_size': 21})
+
+        big = '---\n' + '\n'.join('k{0}: [{1}]'.format(i, ', '.join(['x'] * 50)) for i in range(5000))
+        self.assertLimit('seconds', big + '\n---\n', seconds=0.01)
+
+    def test_files(self):
+        "errors name the file, and normal posts load the same"
+        with self.assertRaises(LimitError) as context:
+            frontmatter.load('tests/hello-world.markdown', limits={'header_size': 10})
+        self.assertTrue('tests/hello-world.markdown' in '{0}'.format(context.exception))
+
+        limits = Limits(header_size=10000, depth=10, aliases=100, seconds=5)
+        for filename in glob.glob('tests/*'):
+            self.assertEqual(frontmatter.load(filename, limits=limits).to_dict(),
+                             frontmatter.load(filename).to_dict())
+
+
+class BatchTest(unittest.TestCase):
+    """
+    Tests for loading many files at once
+    """
+    FILES = sorted(glob.glob('tests/*'))
+
+    def test_load_many(self):
+        "load_many matches load, in order"
+        posts = list(frontmatter.load_many(self.FILES))
+        self.assertEqual(len(posts), len(self.FILES))
+
+        for filename, post in zip(self.FILES, posts):
+            self.assertEqual(post.to_dict(), frontmatter.load(filename).to_dict())
+
+    def test_load_many_processes(self):
+        "load_many in worker processes gives the same posts"
+        serial = [p.to_dict() for p in frontmatter.load_many(self.FILES)]
+        parallel = [p.to_dict() for p in frontmatter.load_many(self.FILES, processes=2)]
+        self.assertEqual(serial, parallel)
+
+    def test_dedupe(self):
+        "identical files are parsed once and get separate posts"
+        tmp = tempfile.mkdtemp()
+        try:
+            paths = []
+            for name in ('a.md', 'b.md', 'c.md'):
+                paths.append(os.path.join(tmp, name))
+                shutil.copy('tests/unpretty.md', paths[-1])
+            paths.insert(1, 'tests/chinese.txt')
+
+            self.assertEqual(frontmatter.find_duplicates(paths),
+                             [[paths[0], paths[2], paths[3]]])
+
+            expected = [frontmatter.load(path).to_dict() for path in paths]
+            for processes in (None, 2):
+                posts = []
+                for post in frontmatter.load_many(paths, dedupe=True, processes=processes):
+                    # each post should arrive untouched by changes to the ones before it
+                    posts.append(copy.deepcopy(post.to_dict()))
+                    if 'destination' in post:
+                        post['destination']['encoding']['xz']['enabled'] = False
+                        post['destination']['result']['print_to_stdout'] = None
+                self.assertEqual(posts, expected)
+
+            posts = frontmatter.load_many(paths, header_only=True, dedupe=True)
+            self.assertEqual([post._source[0] for post in posts], paths)
+        finally:
+            shutil.rmtree(tmp)
+
+
+class MemoryStorage(Storage):
+    "An in-memory stand-in for remote storage, recording each read"
+    def __init__(self, files, **kwargs):
+        super(MemoryStorage, self).__init__(**kwargs)
+        self.data = {}
+        for filename in files:
+            with open(filename, 'rb') as f:
+                self.data[filename] = f.read()
+        self.reads = []
+
+    def read(self, path, start=0, size=None):
+        self.reads.append((path, start, size))
+        data = self.data[path]
+        return data[start:] if size is None else data[start:start + size]
+
+
+class StorageTest(unittest.TestCase):
+    """
+    Tests for storage backends
+    """
+    FILES = sorted(glob.glob('tests/*'))
+
+    def test_local_storage(self):
+        "loading through local storage matches plain loading"
+        expected = [post.to_dict() for post in frontmatter.load_many(self.FILES)]
+
+        with LocalStorage(max_handles=2, workers=3, ahead=4) as storage:
+            posts = frontmatter.load_many(self.FILES, storage=storage)
+            self.assertEqual([post.to_dict() for post in posts], expected)
+            self.assertTrue(len(storage._handles) <= 2)
+
+    def test_ranged_header_reads(self):
+        "header-only loading reads a small range, growing it as needed"
+        storage = MemoryStorage(self.FILES)
+        for filename in self.FILES:
+            with codecs.open(filename, 'r', 'utf-8') as f:
+                expected = frontmatter.read_header(f)
+            self.assertEqual(storage.read_header(filename, head_size=8), expected)
+
+        storage.reads = []
+        posts = list(frontmatter.load_many(self.FILES, storage=storage, header_only=True))
+        storage.close()
+
+        self.assertEqual([post.metadata for post in posts],
+                         [frontmatter.load(f).metadata for f in self.FILES])
+        self.assertEqual(sorted(storage.reads), [(f, 0, 4096) for f in self.FILES])
+
+
+class ArchiveTest(unittest.TestCase):
+    """
+    Tests for loading posts from zip and tar files
+    """
+    FILES = sorted(glob.glob('tests/*'))
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+
+        self.zip = os.path.join(self.tempdir, 'posts.zip')
+        with zipfile.ZipFile(self.zip, 'w', zipfile.ZIP_DEFLATED) as archive:
+            for filename in self.FILES:
+                archive.write(filename)
+
+        self.tar = os.path.join(self.tempdir, 'posts.tar.gz')
+        with tarfile.open(self.tar, 'w:gz') as archive:
+            for filename in self.FILES:
+                archive.add(filename)
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def check(self, results, header_only=False):
+        self.assertEqual([name for name, post in results], self.FILES)
+        for name, post in results:
+            expected = frontmatter.load(name)
+            self.assertEqual(post.metadata, expected.metadata)
+            self.assertEqual(post.content, '' if header_only else expected.content)
+
+    def test_zip(self):
+        "load every member of a zip file"
+        self.check(list(frontmatter.load_archive(self.zip)))
+        self.check(list(frontmatter.load_archive(self.zip, header_only=True)), True)
+
+    def test_tar(self):
+        "load every member of a gzipped tarball, parsing in processes"
+        self.check(list(frontmatter.load_archive(self.tar, processes=2)))
+        self.check(list(frontmatter.load_archive(self.tar, header_only=True)), True)
+
+    def test_match(self):
+        "only load members matching a pattern"
+        names = [name for name, post in frontmatter.load_archive(self.zip, match='*.md')]
+        self.assertEqual(names, ['tests/unpretty.md'])
+
+
+class SearchTest(unittest.TestCase):
+    """
+    Tests for the search index
+    """
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.files = []
+        for filename in glob.glob('tests/*'):
+            self.files.append(shutil.copy(filename, self.tempdir))
+
+        self.index = Index(fields=['title', 'tags', 'author'])
+        self.index.update(self.files)
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def path(self, name):
+        return os.path.join(self.tempdir, name)
+
+    def test_queries(self):
+        "words, phrases, fields and filters"
+        search = self.index.search
+        self.assertEqual(search('"three dashes"', author='bob'), [
+            self.path('hello-json.markdown'),
+            self.path('hello-markdown.markdown'),
+            self.path('hello-toml.markdown'),
+        ])
+        self.assertEqual(search('title:hello'), [self.path('hello-world.markdown')])
+        self.assertEqual(search('"world hello"'), [])
+        self.assertEqual(search('', tags='todo'), [self.path('network-diagrams.markdown')])
+
+    def test_colons(self):
+        "words with a colon are only split on indexed fields"
+        for name, text in (('time.md', 'Meet at 10:30.'), ('thirty.md', 'Just 30.')):
+            with codecs.open(self.path(name), 'w', 'utf-8') as f:
+                f.write('---\ntitle: {0}\n---\n{1}'.format(name, text))
+        self.index.update([self.path('time.md'), self.path('thirty.md')])
+
+        self.assertEqual(self.index.search('10:30'), [self.path('time.md')])
+        self.assertEqual(self.index.search('title:thirty'), [self.path('thirty.md')])
+
+    def test_save_and_update(self):
+        "a saved index reloads and only re-reads changed files"
+        filename = self.path('index.json.gz')
+        self.index.save(filename)
+        index = Index.open(filename)
+
+        self.assertEqual(index.search('hello'), self.index.search('hello'))
+        self.assertEqual(index.update(self.files), 0)
+
+        changed = self.path('hello-world.markdown')
+        with codecs.open(changed, 'a', 'utf-8') as f:
+            f.write('\nA brand new paragraph.')
+        os.utime(changed, (0, 0))
+
+        self.assertEqual(index.update(self.files), 1)
+        self.assertEqual(index.search('brand new'), [changed])
+
+        # files left out are dropped
+        self.assertEqual(index.update([changed]), 0)
+        self.assertEqual(len(index), 1)
+
+
+class SnapshotTest(unittest.TestCase):
+    """
+    Tests for snapshotting and diffing content trees
+    """
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.root = os.path.join(self.tempdir, 'tests')
+        shutil.copytree('tests', self.root)
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def write(self, name, text):
+        with codecs.open(os.path.join(self.root, name), 'w', 'utf-8') as f:
+            f.write(text)
+
+    def test_diff(self):
+        "report added, removed and changed posts, with changed keys"
+        old = Snapshot.build(self.root)
+        filename = os.path.join(self.tempdir, 'snapshot.json')
+        old.save(filename)
+
+        self.write('hello-world.markdown', '---\ntitle: New\nlayout: post\ndraft: true\n---\n')
+        self.write('unpretty.md', '---\n# just a comment\n' + frontmatter.dumps(frontmatter.load('tests/unpretty.md'))[4:])
+        self.write('new.md', '---\ntitle: New\n---\n')
+        os.remove(os.path.join(self.root, 'chinese.txt'))
+
+        new = Snapshot.build(self.root, previous=Snapshot.open(filename))
+        self.assertEqual(old.diff(new), (
+            ['new.md'],
+            ['chinese.txt'],
+            {'hello-world.markdown': ['draft', 'title']},
+        ))
+
+    def test_unchanged_headers_reused(self):
+        "files with the same frontmatter text aren't parsed again"
+        old = Snapshot.build(self.root)
+        with codecs.open(os.path.join(self.root, 'hello-markdown.markdown'), 'a', 'utf-8') as f:
+            f.write('\nA change to the body only.')
+
+        new = Snapshot.build(self.root, previous=old)
+        for path, entry in new.entries.items():
+            self.assertTrue(entry is old.entries[path])
+        self.assertEqual(old.diff(new).changed, {})
+
+    def test_non_posts(self):
+        "only post files are walked, and undecodable files aren't posts"
+        os.mkdir(os.path.join(self.root, '.git'))
+        for name in ('image.png', os.path.join('.git', 'index'), 'binary.md'):
+            with open(os.path.join(self.root, name), 'wb') as f:
+                f.write(b'\x89PNG\r\n\x1a\n\xff\xfe')
+
+        snapshot = Snapshot.build(self.root)
+        self.assertEqual(sorted(snapshot.entries), sorted(os.listdir('tests') + ['binary.md']))
+        self.assertEqual(snapshot.entries['binary.md'], (None, {}))
+
+        snapshot = Snapshot.build(self.root, paths=['image.png'])
+        self.assertEqual(snapshot.entries, {'image.png': (None, {})})
+
+
+class CodecHandler(YAMLHandler):
+    "A custom handler, for encoding tests"
+
+
+class CodecTest(unittest.TestCase):
+    """
+    Tests for the binary post encoding and pickling
+    """
+    def test_values(self):
+        "metadata types survive a round trip"
+        value = {
+            'none': None, 'flags': [True, False], 'ints': [0, -1, 300, 2 ** 70],
+            'float': 1.5, 'text': '中文', 'bytes': b'\x00\xff', 'tuple': (1, 2),
+            'set': set([3]), 'date': datetime.date(2020, 1, 2),
+            'datetime': datetime.datetime(2020, 1, 2, 3, 4, 5, 6),
+            'times': [datetime.time(7, 32), datetime.time(23, 59, 59, 999999),
+                      datetime.time(1, 2, 3, tzinfo=datetime.timezone(
+                          datetime.timedelta(hours=-5)))],
+            'nested': {'a': [{'b': []}]},
+        }
+        self.assertEqual(decode(encode(value)), value)
+        self.assertRaises(TypeError, encode, object())
+
+        if TOMLHandler is not None:
+            post = frontmatter.loads('+++\nstart = 07:32:00\n+++\n')
+            self.assertEqual(frontmatter.Post.from_bytes(post.to_bytes())['start'],
+                             datetime.time(7, 32))
+
+    def test_posts(self):
+        "posts keep their metadata, content, handler and raw frontmatter"
+        for filename in glob.glob('tests/*'):
+            post = frontmatter.load(filename)
+            for data in (post.to_bytes(), post.to_bytes(compress=True),):
+                copy = frontmatter.Post.from_bytes(data)
+                self.assertEqual(copy.to_dict(), post.to_dict())
+                self.assertEqual(type(copy.handler), type(post.handler))
+                self.assertEqual(copy._fm, post._fm)
+                self.assertEqual(frontmatter.dumps(copy), frontmatter.dumps(post))
+
+        self.assertRaises(ValueError, frontmatter.Post.from_bytes, b'nope')
+
+    def test_custom_handlers(self):
+        "custom handlers must be registered to be decoded, and are never imported"
+        post = frontmatter.load('tests/hello-world.markdown', handler=CodecHandler())
+        data = post.to_bytes()
+        self.assertRaises(ValueError, frontmatter.Post.from_bytes, data)
+
+        register_handler(CodecHandler)
+        self.assertTrue(isinstance(frontmatter.Post.from_bytes(data).handler, CodecHandler))
+
+        # importing "this" would print the Zen of Python
+        self.assertRaises(ValueError, handler_from_name, 'this:Handler')
+        self.assertFalse('this' in sys.modules)
+
+    def test_pickle(self):
+        "pickled posts are smaller and keep what they were loaded from"
+        post = frontmatter.load('tests/unpretty.md')
+        data = pickle.dumps(post, pickle.HIGHEST_PROTOCOL)
+        self.assertTrue(len(data) < len(pickle.dumps(post.__dict__, pickle.HIGHEST_PROTOCOL)))
+
+        copy = pickle.loads(data)
+        self.assertEqual(copy.to_dict(), post.to_dict())
+        self.assertEqual(copy._fm, post._fm)
+        self.assertTrue(isinstance(copy.handler, YAMLHandler))
+
+        # changes made before pickling or encoding are kept
+        post['title'] = 'Changed'
+        post['filter'].append('third')
+        for copy in (pickle.loads(pickle.dumps(post)),
+                     frontmatter.Post.from_bytes(post.to_bytes())):
+            self.assertEqual(frontmatter.dumps(copy), frontmatter.dumps(post))
+            self.assertTrue('title: Changed' in frontmatter.dumps(copy))
+
+        post = frontmatter.load('tests/unpretty.md')
+        post['filter'].append('third')
+        self.assertTrue('- third' in frontmatter.dumps(pickle.loads(pickle.dumps(post))))
+
+        # handlers with their own settings are pickled whole
+        post.handler = YAMLHandler(start_delimiter='+++')
+        self.assertEqual(pickle.loads(pickle.dumps(post)).handler.START_DELIMITER, '+++')
+
+
+class BundleTest(unittest.TestCase):
+    """
+    Tests for packing posts into a bundle and reading them back
+    """
+    FILES = sorted(glob.glob('tests/*'))
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tempdir, 'corpus.fmb')
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def test_round_trip(self):
+        "bundled posts match loaded posts"
+        self.assertEqual(frontmatter.pack(self.FILES, self.filename, processes=2), len(self.FILES))
+
+        with Bundle(self.filename) as bundle:
+            self.assertEqual(list(bundle), self.FILES)
+            for filename in self.FILES:
+                post, packed = frontmatter.load(filename), bundle[filename]
+                self.assertEqual(packed.to_dict(), post.to_dict())
+                self.assertEqual(type(packed.handler), type(post.handler))
+                self.assertEqual(frontmatter.dumps(packed), frontmatter.dumps(post))
+                self.assertEqual(bundle.metadata(filename), post.metadata)
+
+            self.assertTrue('missing' not in bundle)
+            self.assertEqual(bundle.get('missing'), None)
+            self.assertRaises(KeyError, bundle.__getitem__, 'missing')
+
+    def test_not_a_bundle(self):
+        self.assertRaises(ValueError, Bundle, 'tests/hello-world.markdown')
+
+
+def shared_posts(name):
+    "Read every post from a shared corpus, in a worker process"
+    corpus = SharedCorpus.attach(name)
+    try:
+        return [corpus[name].to_dict() for name in corpus]
+    finally:
+        corpus.close()
+
+
+class SharedCorpusTest(unittest.TestCase):
+    """
+    Tests for corpora in shared memory
+    """
+    FILES = sorted(glob.glob('tests/*'))
+
+    def setUp(self):
+        self.corpus = SharedCorpus.create(self.FILES)
+
+    def tearDown(self):
+        self.corpus.close()
+        self.corpus.unlink()
+
+    def test_views(self):
+        "views act like posts, read from shared memory"
+        view = self.corpus['tests/hello-world.markdown']
+        post = frontmatter.load('tests/hello-world.markdown')
+        self.assertEqual(view['title'], post['title'])
+        self.assertEqual(view.content, post.content)
+        self.assertTrue('layout' in view)
+        self.assertTrue(isinstance(view.handler, YAMLHandler))
+        self.assertEqual(frontmatter.loads(frontmatter.dumps(view)).to_dict(), post.to_dict())
+        self.assertEqual(frontmatter.dumps(view.to_post()), frontmatter.dumps(post))
+        self.assertRaises(KeyError, self.corpus.__getitem__, 'missing')
+
+    def test_views_decode_once(self):
+        "a view decodes its metadata once, and views share handlers"
+        decoded = []
+        record = self.corpus._record
+        self.corpus._record = lambda name: decoded.append(name) or record(name)
+
+        view = self.corpus['tests/hello-world.markdown']
+        view['title'], view.get('layout'), 'draft' in view, view.handler
+        self.assertEqual(decoded, ['tests/hello-world.markdown'])
+
+        view.to_dict()['title'] = 'Changed'
+        self.assertEqual(view['title'], 'Hello, world!')
+        self.assertTrue(view.handler is self.corpus['tests/unpretty.md'].handler)
+
+    def test_workers(self):
+        "worker processes attach by name and see the same posts"
+        from multiprocessing import Pool
+        pool = Pool(2)
+        try:
+            results = pool.map(shared_posts, [self.corpus.name] * 2)
+        finally:
+            pool.close()
+            pool.join()
+
+        expected = [frontmatter.load(filename).to_dict() for filename in self.FILES]
+        for result in results:
+            self.assertEqual(result, expected)
+
+
+class ListingTest(unittest.TestCase):
+    """
+    Tests for top-N and paged listings
+    """
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        for day in range(1, 8):
+            self.write('{0}.md'.format(day), '---\ndate: 2020-01-0{0}\n---\nPost {0}'.format(day))
+        self.write('undated.md', '---\ntitle: Undated\n---\n')
+        self.write('datetime.md', '---\ndate: 2020-01-04 12:00:00\n---\n')
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def write(self, name, text):
+        with codecs.open(os.path.join(self.root, name), 'w', 'utf-8') as f:
+            f.write(text)
+
+    def names(self, pairs):
+        return [os.path.basename(path) for path, post in pairs]
+
+    def test_top(self):
+        "the top posts are loaded in full, best first"
+        latest = frontmatter.top(self.root, 'date', 3, match='*.md')
+        self.assertEqual(self.names(latest), ['7.md', '6.md', '5.md'])
+        self.assertEqual(latest[0][1].content, 'Post 7')
+
+        earliest = frontmatter.top(self.root, 'date', 4, reverse=False, processes=2)
+        self.assertEqual(self.names(earliest), ['1.md', '2.md', '3.md', '4.md'])
+
+    def test_pages(self):
+        "pages cover every post with the key, in order"
+        listing = Listing(self.root, 'date')
+        names, cursor = [], None
+        while True:
+            page = listing.page(3, cursor)
+            names.extend(self.names(page.posts))
+            cursor = page.cursor
+            if cursor is None:
+                break
+
+        self.assertEqual(names, ['7.md', '6.md', '5.md', 'datetime.md', '4.md', '3.md', '2.md', '1.md'])
+        self.assertEqual(len(listing), 8)
+
+    def test_refresh(self):
+        "cursors survive new posts, and refresh only parses changed files"
+        listing = Listing(self.root, 'date')
+        first = listing.page(2)
+        self.write('8.md', '---\ndate: 2020-01-08\n---\n')
+        self.write('undated.md', '---\ndate: 2019-12-31\n---\n')
+
+        index = listing.index
+        listing.refresh()
+        self.assertEqual(len(listing), 10)
+        self.assertEqual(self.names(listing.page(2, first.cursor).posts), ['5.md', 'datetime.md'])
+        self.assertEqual(self.names(listing.page(1).posts), ['8.md'])
+        self.assertTrue(index is not listing.index)
+
+    def test_mixed_values(self):
+        "values that can't be compared are grouped by type, and other files are skipped"
+        self.write('tbd.md', '---\ndate: TBD\n---\n')
+        self.write('aware.md', '---\ndate: 2020-01-04 11:00:00+02:00\n---\n')
+        self.write('numbered.md', '---\ndate: 3\n---\n')
+        with open(os.path.join(self.root, 'image.png'), 'wb') as f:
+            f.write(b'\x89PNG\r\n\x1a\n\xff\xfe')
+
+        names = self.names(frontmatter.top(self.root, 'date', 4))
+        self.assertEqual(names, ['tbd.md', '7.md', '6.md', '5.md'])
+
+        names = self.names(Listing(self.root, 'date', reverse=False).page(6).posts)
+        self.assertEqual(names, ['numbered.md', '1.md', '2.md', '3.md', '4.md', 'aware.md'])
+
+
+class FacetTest(unittest.TestCase):
+    """
+    Tests for counting metadata values across many files
+    """
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.paths = []
+        for i in range(30):
+            path = os.path.join(self.root, '{0}.md'.format(i))
+            with codecs.open(path, 'w', 'utf-8') as f:
+                f.write('---\ndate: 2020-0{0}-1{1}\ntags: [all, tag{2}]\n---\nBody'.format(
+                    i % 3 + 1, i % 2, i % 5))
+            self.paths.append(path)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_aggregate(self):
+        "count list items and dates by period"
+        counts = frontmatter.aggregate(self.paths, ['tags', 'date:month', 'date:day', 'missing'],
+                                       chunksize=7)
+        self.assertEqual(counts['tags']['all'], 30)
+        self.assertEqual(counts['tags']['tag0'], 6)
+        self.assertEqual(counts['date:month'], {'2020-01': 10, '2020-02': 10, '2020-03': 10})
+        self.assertEqual(sum(counts['date:day'].values()), 30)
+        self.assertEqual(counts['missing'], {})
+
+    def test_aggregate_processes(self):
+        "worker processes give the same counts"
+        facets = ['tags', 'date:year']
+        self.assertEqual(frontmatter.aggregate(self.paths, facets, processes=2, chunksize=4),
+                         frontmatter.aggregate(self.paths, facets))
+
+    def test_colons_and_non_dates(self):
+        "keys may contain colons, and values that aren't dates aren't counted by period"
+        path = os.path.join(self.root, 'odd.md')
+        with codecs.open(path, 'w', 'utf-8') as f:
+            f.write('---\nog:title: Odd\ndate:week: 5\ndate: [Soon, "2021-06", 2022]\n---\n')
+
+        counts = frontmatter.aggregate([path], ['og:title', 'date:week', 'date:year',
+                                                'date:month'])
+        self.assertEqual(counts['og:title'], {'Odd': 1})
+        self.assertEqual(counts['date:week'], {5: 1})
+        self.assertEqual(counts['date:year'], {'2021': 1})
+        self.assertEqual(counts['date:month'], {'2021-06': 1})
+
+
+class ColumnsTest(unittest.TestCase):
+    """
+    Tests for exporting metadata as columns
+    """
+    FILES = ['tests/hello-world.markdown', 'tests/hello-json.markdown']
+
+    def test_to_columns(self):
+        "one column per key, padded with None"
+        columns = frontmatter.to_columns(frontmatter.load_many(self.FILES),
+            content_length=True, body_offset=True, arrays=False)
+
+        self.assertEqual(columns['title'], ['Hello, world!', None])
+        self.assertEqual(columns['author'], [None, 'bob'])
+
+        # offsets point at content in the original text
+        for filename, length, offset in zip(self.FILES,
+                columns['content_length'], columns['body_offset']):
+            with codecs.open(filename, 'r', 'utf-8') as f:
+                text = f.read()
+            self.assertEqual(text[offset:offset + length],
+                             frontmatter.load(filename).content)
+
+    def test_numpy_columns(self):
+        "numeric columns become typed arrays when numpy is around"
+        try:
+            import numpy
+        except ImportError:
+            return
+        posts = [frontmatter.Post('', count=1), frontmatter.Post('', count=2)]
+        columns = frontmatter.to_columns(posts, keys=['count', 'missing'])
+
+        self.assertEqual(columns['count'].dtype, numpy.dtype('int64'))
+        self.assertEqual(columns['missing'], [None, None])
+
+        # integers too big for int64 stay exact, in a list
+        posts.append(frontmatter.Post('', count=2 ** 70))
+        self.assertEqual(frontmatter.to_columns(posts)['count'], [1, 2, 2 ** 70])
+
+    def test_key_iterator(self):
+        "keys can be any iterable, used once"
+        posts = [frontmatter.Post('', a=1, b=2)]
+        columns = frontmatter.to_columns(posts, keys=(k for k in ['b']), arrays=False)
+        self.assertEqual(columns, {'b': [2]})
+
+
+class ImportTest(unittest.TestCase):
+    """
+    Guard against import-time regressions
+    """
+    LAZY = ['yaml', 'toml', 'json', 'six']
+
+    # stdlib modules that only some features need
+    HEAVY = ['zipfile', 'tarfile', 'pickle', 'mmap', 'multiprocessing', 'hashlib']
+
+    def test_import_time(self):
+        "importing frontmatter doesn't import metadata backends or heavy modules"
+        if sys.version_info < (3, 7):
+            return
+
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', 'import frontmatter'],
+            stderr=subprocess.PIPE, universal_newlines=True, check=True)
+
+        imported = {}
+        for line in result.stderr.splitlines():
+            if not line.startswith('import time:') or '|' not in line:
+                continue
+            _, cumulative, name = line.split('|')
+            if cumulative.strip().isdigit():
+                imported[name.strip()] = int(cumulative)
+
+        self.assertTrue('frontmatter' in imported)
+        for name in self.LAZY + self.HEAVY:
+            self.assertFalse(name in imported, '{0} imported eagerly'.format(name))
+
+        # a generous bound, in microseconds, that a regression would still cross
+        self.assertTrue(imported['frontmatter'] < 150000, imported['frontmatter'])
+
+    def test_backends_load_on_use(self):
+        "loading TOML or JSON doesn't import PyYAML"
+        code = textwrap.dedent("""
+            import sys, frontmatter
+            frontmatter.load('tests/hello-json.markdown')
+            frontmatter.load('tests/hello-toml.markdown')
+            print('yaml' in sys.modules)
+        """)
+        output = subprocess.check_output([sys.executable, '-c', code])
+        self.assertEqual(output.strip(), b'False')
+
+
+class CliTest(unittest.TestCase):
+    """
+    Tests for the command line tool
+    """
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.output = os.path.join(self.tempdir, 'out')
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def run_cli(self, *args):
+        from frontmatter.cli import main
+        code = main(list(args) + ['-o', self.output])
+        with codecs.open(self.output, 'r', 'utf-8') as f:
+            return code, f.read()
+
+    def test_jsonl_with_filters(self):
+        "walk a directory, filter and select keys"
+        code, output = self.run_cli('tests', '-k', 'title', '-w', 'tags~=todo', '-j', '2')
+        records = [json.loads(line) for line in output.splitlines()]
+
+        self.assertEqual(code, 0)
+        self.assertEqual(records, [{
+            'path': os.path.join('tests', 'network-diagrams.markdown'),
+            'title': 'TODO: Understand Network Diagrams',
+        }])
+
+    def test_csv(self):
+        "CSV output has a header row and one row per match"
+        code, output = self.run_cli('tests', '-f', 'csv', '-k', 'author', '-w', 'author=bob', '-j', '1')
+        rows = output.splitlines()
+
+        self.assertEqual(rows[0], 'path,author')
+        self.assertEqual(len(rows), 4)
+        self.assertTrue(all(row.endswith(',bob') for row in rows[1:]))
+
+
 if __name__ == "__main__":
     doctest.testfile('README.md')
     doctest.testmod(frontmatter.default_handlers, extraglobs={'frontmatter': frontmatter})
+    doctest.testmod(frontmatter.schema, extraglobs={'frontmatter': frontmatter})
+    doctest.testmod(frontmatter.batch, extraglobs={'frontmatter': frontmatter})
+    doctest.testmod(frontmatter.columns, extraglobs={'frontmatter': frontmatter})
+    doctest.testmod(frontmatter.search, extraglobs={'frontmatter': frontmatter})
+    doctest.testmod(frontmatter.storage, extraglobs={'frontmatter': frontmatter})
+    doctest.testmod(frontmatter.snapshot)
+    doctest.testmod(frontmatter.codec)
+    doctest.testmod(frontmatter.listing, extraglobs={'frontmatter': frontmatter})
+    doctest.testmod(frontmatter.facets, extraglobs={'frontmatter': frontmatter})
+    doctest.testmod(frontmatter.limits, extraglobs={'frontmatter': frontmatter})
+    doctest.testmod(frontmatter.bundle, extraglobs={'frontmatter': frontmatter})
+    doctest.testmod(frontmatter.shared)
     unittest.main()